@@ -0,0 +1,430 @@
+"""
+Benchmarks for the ingest -> match -> infer -> persist pipeline
+
+Each stage is timed on its own and then end to end, against a throwaway
+SQLite database and a deterministic stub model, so runs need no network,
+no model download and no GPU. Results are written as JSON and compared
+against a stored baseline; any benchmark slower than the baseline by more
+than the threshold fails the run.
+
+Usage (from backend/):
+    python benchmarks.py                    # full run (1M posts)
+    python benchmarks.py --quick            # smaller data sets for a fast check
+    python benchmarks.py --save-baseline    # store this run as the baseline
+    python benchmarks.py --only match infer # run selected stages
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+# The benchmarks run against a scratch database and an in-process stub
+# model, so these have to be set before the backend modules are imported
+_scratch_dir = tempfile.mkdtemp(prefix="pulse-bench-")
+os.environ["SENTIMENT_DB_PATH"] = os.path.join(_scratch_dir, "bench.db")
+os.environ["SENTIMENT_CACHE_PATH"] = ""
+os.environ["INFERENCE_BACKEND"] = "thread"
+os.environ["MODEL_WARMUP"] = "0"
+
+import database
+import post_processor
+import sentiment_analyzer
+from inference_engines import SentimentEngine
+from keyword_matcher import KeywordMatcher
+from sentiment_cache import SentimentCache
+
+STAGES = ("match", "db", "infer", "pipeline")
+
+DEFAULT_OUTPUT = "benchmark_results.json"
+DEFAULT_BASELINE = "benchmark_baseline.json"
+
+# Slowdown (per operation) tolerated before a benchmark counts as a regression
+DEFAULT_THRESHOLD = 0.20
+
+# Stub model cost: fixed per forward pass plus per padded token, so batching
+# and length bucketing pay off the way they do with the real model
+STUB_PASS_SECONDS = 0.002
+STUB_TOKEN_SECONDS = 0.000002
+
+WORDS = (
+    "the a great terrible new update phone car service app price love hate "
+    "battery screen camera delivery support launch review today really just "
+    "never always again better worse fast slow broken amazing awful fine"
+).split()
+
+KEYWORDS = ["tesla", "iphone", "netflix", "starbucks", "airpods"]
+
+class _WhitespaceTokenizer:
+    """Stands in for a Hugging Face tokenizer: one token per word plus [CLS]/[SEP]"""
+
+    def __call__(self, texts, truncation=False, max_length=None, **kwargs):
+        input_ids = []
+        for text in texts:
+            ids = [101] + [zlib.crc32(word.encode()) % 30000 for word in text.split()] + [102]
+            if truncation and max_length:
+                ids = ids[:max_length]
+            input_ids.append(ids)
+        return {"input_ids": input_ids}
+
+class StubEngine(SentimentEngine):
+    """Deterministic offline model: labels come from a text hash, cost from padded batch size"""
+
+    name = "stub"
+
+    def _load(self):
+        self._tokenizer = _WhitespaceTokenizer()
+
+    def _predict(self, texts: List[str]) -> List[Dict]:
+        tokens = self._tokenizer(texts, truncation=True, max_length=self.max_tokens)["input_ids"]
+        padded = len(texts) * max(len(ids) for ids in tokens)
+        time.sleep(STUB_PASS_SECONDS + STUB_TOKEN_SECONDS * padded)
+
+        results = []
+        for text in texts:
+            digest = zlib.crc32(text.encode())
+            results.append({
+                "label": "POSITIVE" if digest & 1 else "NEGATIVE",
+                "score": 0.5 + (digest % 500) / 1000
+            })
+        return results
+
+def install_stub_model():
+    """Route sentiment_analyzer through the stub engine with caching disabled"""
+    sentiment_analyzer._sentiment_engine = StubEngine(sentiment_analyzer.MODEL_NAME)
+    sentiment_analyzer.sentiment_cache = SentimentCache(max_entries=0, path="")
+
+def make_text(rng: random.Random, words: int, keyword: str = None) -> str:
+    """Random post text, optionally mentioning a keyword"""
+    tokens = [rng.choice(WORDS) for _ in range(words)]
+    if keyword:
+        tokens.insert(rng.randrange(len(tokens) + 1), keyword)
+    return " ".join(tokens)
+
+def make_post_length(rng: random.Random) -> int:
+    """Our traffic mix: mostly tweet-sized posts, some long Reddit posts"""
+    return rng.randint(10, 30) if rng.random() < 0.8 else rng.randint(200, 400)
+
+def make_posts(rng: random.Random, count: int, match_rate: float = 0.3) -> List[Dict]:
+    """Posts spread over the last 30 days, match_rate of them mentioning a keyword"""
+    now = datetime.now()
+    posts = []
+    for _ in range(count):
+        keyword = rng.choice(KEYWORDS) if rng.random() < match_rate else None
+        timestamp = now - timedelta(seconds=rng.randint(0, 30 * 24 * 3600))
+        posts.append({
+            "text": make_text(rng, rng.randint(10, 30), keyword),
+            "timestamp": timestamp.isoformat(timespec="seconds"),
+            "source": rng.choice(["Twitter", "Reddit", "Facebook"])
+        })
+    return posts
+
+class BenchmarkResults:
+    """Collects timings as {name: {ops, seconds, ops_per_sec, us_per_op}}"""
+
+    def __init__(self):
+        self.results: Dict[str, Dict] = {}
+
+    def record(self, name: str, ops: int, seconds: float):
+        ops = max(1, ops)
+        self.results[name] = {
+            "ops": ops,
+            "seconds": round(seconds, 6),
+            "ops_per_sec": round(ops / seconds, 2) if seconds > 0 else None,
+            "us_per_op": round(seconds / ops * 1e6, 3)
+        }
+        print(f"  {name:<40} {ops:>9} ops  {seconds:>9.3f}s  {seconds / ops * 1e6:>12.2f} us/op")
+
+async def bench_match(bench: BenchmarkResults, posts: int):
+    """KeywordMatcher build, first-match and all-matches scans with 10 to 10k keywords"""
+    print("Keyword matching")
+    rng = random.Random(1)
+    texts = [make_text(rng, make_post_length(rng)) for _ in range(posts)]
+
+    for count in (10, 100, 1000, 10000):
+        keywords = [f"{rng.choice(WORDS)}{i}" for i in range(count)]
+        # Make some of the posts actually match
+        hit_texts = [
+            f"{text} {keywords[i % count]}" if i % 3 == 0 else text
+            for i, text in enumerate(texts)
+        ]
+
+        # Built once per keyword set, as get_keyword_matcher() does for live processing
+        start = time.perf_counter()
+        matcher = KeywordMatcher(keywords)
+        bench.record(f"match.build.{count}_keywords", 1, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for text in hit_texts:
+            matcher.match_first(text)
+        bench.record(f"match.scan.{count}_keywords", len(hit_texts), time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for text in hit_texts:
+            matcher.match_all(text)
+        bench.record(f"match.scan_all.{count}_keywords", len(hit_texts), time.perf_counter() - start)
+
+async def bench_db(bench: BenchmarkResults, rows: int, iterations: int):
+    """database.py inserts, updates and queries on a table of `rows` posts"""
+    print(f"Database ({rows:,} posts)")
+    rng = random.Random(2)
+
+    start = time.perf_counter()
+    inserted = 0
+    while inserted < rows:
+        chunk = make_posts(rng, min(10000, rows - inserted))
+        await database.create_posts_bulk(chunk)
+        inserted += len(chunk)
+    bench.record("db.create_posts_bulk", inserted, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for post in make_posts(rng, iterations):
+        await database.create_post(post["text"], post["timestamp"], post["source"])
+    bench.record("db.create_post", iterations, time.perf_counter() - start)
+
+    # Claim and score a slice of the backlog so the rollups and feed have data
+    claimed = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        claimed.extend(await database.claim_pending_posts(256, 60))
+    bench.record("db.claim_pending_posts", len(claimed), time.perf_counter() - start)
+
+    def sentiment_for(post):
+        return {
+            "post_id": post["id"],
+            "sentiment_label": rng.choice(["POSITIVE", "NEUTRAL", "NEGATIVE"]),
+            "sentiment_score": round(rng.random(), 4),
+            "keyword_matched": rng.choice(KEYWORDS)
+        }
+
+    singles, bulk = claimed[:iterations], claimed[iterations:]
+
+    start = time.perf_counter()
+    for post in singles:
+        result = sentiment_for(post)
+        await database.update_post_sentiment(
+            result["post_id"], result["sentiment_label"],
+            result["sentiment_score"], result["keyword_matched"]
+        )
+    bench.record("db.update_post_sentiment", len(singles), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(0, len(bulk), 256):
+        await database.update_posts_sentiment_bulk([sentiment_for(post) for post in bulk[i:i + 256]])
+    bench.record("db.update_posts_sentiment_bulk", len(bulk), time.perf_counter() - start)
+
+    max_id = inserted + iterations
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await database.get_post(rng.randint(1, max_id))
+    bench.record("db.get_post", iterations, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(iterations // 10 or 1):
+        await database.get_posts(rng.sample(range(1, max_id + 1), 256))
+    bench.record("db.get_posts_256", iterations // 10 or 1, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await database.get_recent_posts(20)
+    bench.record("db.get_recent_posts", iterations, time.perf_counter() - start)
+
+    # Keyset paging stays flat however deep the page is
+    start = time.perf_counter()
+    pages = 0
+    before = None
+    for _ in range(iterations):
+        page = await database.get_recent_posts(20, before=before)
+        if not page:
+            break
+        before = (page[-1]["timestamp"], page[-1]["id"])
+        pages += 1
+    bench.record("db.get_recent_posts_paged", pages, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await database.get_recent_posts(20, keyword=rng.choice(KEYWORDS), sentiment="NEGATIVE")
+    bench.record("db.get_recent_posts_filtered", iterations, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await database.search_posts(f'{rng.choice(KEYWORDS)} OR "great product"', limit=20)
+    bench.record("db.search_posts", iterations, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await database.get_dashboard_stats()
+    bench.record("db.get_dashboard_stats", iterations, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await database.get_hourly_trends(24)
+    bench.record("db.get_hourly_trends_24h", iterations, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await database.get_hourly_trends(24 * 30)
+    bench.record("db.get_hourly_trends_30d", iterations, time.perf_counter() - start)
+
+    end = datetime.now()
+    for resolution in ("hour", "day"):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await database.get_sentiment_trends(resolution, end - timedelta(days=90), end, rng.choice(KEYWORDS))
+        bench.record(f"db.get_sentiment_trends_90d_{resolution}", iterations, time.perf_counter() - start)
+
+async def bench_infer(bench: BenchmarkResults, texts_count: int):
+    """analyze_sentiment (concurrent and sequential) versus analyze_sentiment_batch"""
+    print("Inference (stub model)")
+    rng = random.Random(3)
+    # Unique texts, so in-flight coalescing doesn't skip any work
+    texts = [f"{i} {make_text(rng, make_post_length(rng))}" for i in range(texts_count)]
+
+    sequential = texts[:max(1, texts_count // 20)]
+    start = time.perf_counter()
+    for text in sequential:
+        await sentiment_analyzer.analyze_sentiment(text)
+    bench.record("infer.analyze_sentiment.sequential", len(sequential), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[sentiment_analyzer.analyze_sentiment(text) for text in texts])
+    bench.record("infer.analyze_sentiment.concurrent", len(texts), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    batch_size = post_processor.PROCESS_BATCH_SIZE
+    for i in range(0, len(texts), batch_size):
+        await sentiment_analyzer.analyze_sentiment_batch(texts[i:i + batch_size])
+    bench.record("infer.analyze_sentiment_batch", len(texts), time.perf_counter() - start)
+
+async def bench_pipeline(bench: BenchmarkResults, posts_count: int):
+    """Ingest, match, classify and store a fresh batch of posts"""
+    print("End to end")
+    rng = random.Random(4)
+    for keyword in KEYWORDS:
+        await database.add_keyword(keyword)
+    posts = make_posts(rng, posts_count)
+
+    start = time.perf_counter()
+    post_ids = await database.create_posts_bulk(posts)
+    ingested = time.perf_counter()
+    results = await post_processor.process_posts_batch(post_ids)
+    done = time.perf_counter()
+
+    errors = sum(1 for result in results if result["status"] == "error")
+    if errors:
+        raise RuntimeError(f"{errors} posts failed during the end-to-end benchmark")
+
+    bench.record("pipeline.ingest", len(post_ids), ingested - start)
+    bench.record("pipeline.process", len(post_ids), done - ingested)
+    bench.record("pipeline.end_to_end", len(post_ids), done - start)
+
+def compare_with_baseline(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Print per-benchmark changes and return the names that regressed"""
+    baseline_results = baseline.get("results", {})
+    if baseline.get("config") != results["config"]:
+        print("Warning: baseline was recorded with a different configuration")
+
+    regressions = []
+    print(f"\nCompared with baseline (threshold {threshold:.0%} slower per op):")
+    for name, result in results["results"].items():
+        previous = baseline_results.get(name)
+        if previous is None:
+            print(f"  {name:<40} new")
+            continue
+        change = result["us_per_op"] / previous["us_per_op"] - 1 if previous["us_per_op"] else 0.0
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"  {name:<40} {change:>+8.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+async def run(args) -> Dict:
+    install_stub_model()
+    await database.open_pool()
+    await database.init_db()
+
+    bench = BenchmarkResults()
+    try:
+        if "match" in args.only:
+            await bench_match(bench, args.match_posts)
+        if "db" in args.only:
+            await bench_db(bench, args.rows, args.iterations)
+        if "infer" in args.only:
+            await bench_infer(bench, args.infer_texts)
+        if "pipeline" in args.only:
+            await bench_pipeline(bench, args.pipeline_posts)
+    finally:
+        await sentiment_analyzer.inference_scheduler.close()
+        await database.close_pool()
+
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "config": {
+            "stages": sorted(args.only),
+            "rows": args.rows,
+            "iterations": args.iterations,
+            "match_posts": args.match_posts,
+            "infer_texts": args.infer_texts,
+            "pipeline_posts": args.pipeline_posts
+        },
+        "results": bench.results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sentiment pipeline")
+    parser.add_argument("--quick", action="store_true", help="Small data sets for a fast check")
+    parser.add_argument("--only", nargs="+", choices=STAGES, default=list(STAGES), help="Stages to run")
+    parser.add_argument("--rows", type=int, help="Posts in the database benchmarks (default 1,000,000)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown per op before failing (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.rows = args.rows or 50000
+        args.iterations, args.match_posts, args.infer_texts, args.pipeline_posts = 200, 2000, 500, 2000
+    else:
+        args.rows = args.rows or 1000000
+        args.iterations, args.match_posts, args.infer_texts, args.pipeline_posts = 1000, 20000, 2000, 10000
+
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        shutil.rmtree(_scratch_dir, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline} (save one with --save-baseline)")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare_with_baseline(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\nNo regressions")
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,245 @@
 import aiosqlite
-from datetime import datetime
-from typing import Optional, List, Dict
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Optional, List, Dict, Tuple
 import os
+import pathlib
+import time
 
-DATABASE_PATH = os.path.join(os.path.dirname(__file__), "sentiment_monitor.db")
+from metrics import DB_CALL_SECONDS, POSTS_INGESTED
+
+DATABASE_PATH = os.getenv(
+    "SENTIMENT_DB_PATH",
+    os.path.join(os.path.dirname(__file__), "sentiment_monitor.db")
+)
+
+# Connection pool tuning
+DB_READER_CONNECTIONS = int(os.getenv("DB_READER_CONNECTIONS", "4"))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_STATEMENT_CACHE_SIZE = 256
+
+# Max IDs bound into a single IN (...) query
+SQL_CHUNK_SIZE = 500
+
+# sentiment_trends rows with this keyword hold the totals across all keywords
+ALL_KEYWORDS = ""
+
+# Filters of the processed-posts feed and the partial indexes behind them.
+# Every index ends in timestamp (plus the implicit rowid), so a keyset page
+# on (timestamp, id) is a single index range scan. Each index costs every
+# processed post an extra write, so only the common filter combinations get
+# one; the rest seek on the widest index they cover and filter the remainder.
+# Keyword feeds are served from post_keywords instead.
+FEED_FILTERS = {"sentiment": "sentiment_label", "source": "source"}
+FEED_INDEXES = {
+    "idx_posts_feed": (),
+    "idx_posts_feed_sentiment": ("sentiment_label",),
+    "idx_posts_feed_source": ("source",),
+}
+
+# Every keyword a posts row matched, as one column of a posts query (see _split_keywords)
+KEYWORD_SEPARATOR = "\x1f"
+POST_KEYWORDS_SQL = (
+    "(SELECT group_concat(keyword, char(31)) FROM post_keywords "
+    "WHERE post_keywords.post_id = posts.id) AS keywords"
+)
+
+# Minute bucket for a post, falling back to ingest time if its timestamp won't parse
+MINUTE_BUCKET_SQL = (
+    "COALESCE(strftime('%Y-%m-%d %H:%M:00', timestamp), "
+    "strftime('%Y-%m-%d %H:%M:00', created_at))"
+)
+
+# Rollup tiers, finest first, with their bucket size in seconds. The minute
+# tier is bumped as posts are processed; each coarser tier is recomputed
+# from the one before it. The hour tier is the original sentiment_trends
+# table, the others live in sentiment_rollups.
+ROLLUP_RESOLUTIONS = {"minute": 60, "5min": 300, "hour": 3600, "day": 86400}
+BUCKET_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Columns kept in archived post partitions (everything but the claim lease)
+ARCHIVED_POST_COLUMNS = (
+    "id, text, timestamp, source, keyword_matched, sentiment_label, "
+    "sentiment_score, processing_status, created_at, duplicate_of"
+)
+
+# Rows deleted from the hot posts table per transaction when archiving. Each
+# row also clears its indexes, post_keywords and search entries (~20 us), so
+# 1000 rows hold the writer for ~20 ms at a time while ingest keeps going
+ARCHIVE_DELETE_CHUNK = 1000
+
+# Most buckets a single trends query may return
+TRENDS_MAX_POINTS = int(os.getenv("TRENDS_MAX_POINTS", "10000"))
+
+_SENTIMENT_COUNT_INDEX = {"POSITIVE": 0, "NEUTRAL": 1, "NEGATIVE": 2}
+
+# Ingest time with milliseconds, so ingest-to-processed latency can be measured
+NOW_SQL = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+# Bumped on every keyword change so in-memory matchers know when to rebuild
+_keywords_version = 0
+
+def get_keywords_version() -> int:
+    """Get the current keyword set version"""
+    return _keywords_version
+
+def bump_keywords_version():
+    """Mark cached keyword matchers stale (also called when another worker changed the keywords)"""
+    global _keywords_version
+    _keywords_version += 1
+
+def _timed(func):
+    """Record each call's latency in the db_call_seconds histogram"""
+    histogram = DB_CALL_SECONDS.labels(operation=func.__name__)
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    return wrapper
 
 async def get_db():
-    """Get database connection"""
-    db = await aiosqlite.connect(DATABASE_PATH)
+    """Open a standalone database connection with our pragmas applied"""
+    db = await aiosqlite.connect(
+        DATABASE_PATH,
+        cached_statements=DB_STATEMENT_CACHE_SIZE,
+        # Lets archived partitions be attached read-only via file: URIs
+        uri=True
+    )
     db.row_factory = aiosqlite.Row
+    await db.execute("PRAGMA busy_timeout = 5000")
+    await db.execute("PRAGMA synchronous = NORMAL")
+    await db.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}")
+    await db.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+    await db.execute("PRAGMA temp_store = MEMORY")
     return db
 
+class ConnectionPool:
+    """
+    Long-lived SQLite connections shared by the whole app
+
+    One writer connection serialised behind a lock (SQLite allows a single
+    writer anyway) and a small set of reader connections that WAL mode lets
+    run alongside it. Connections stay open, so each one keeps its own
+    prepared-statement cache warm across requests.
+    """
+
+    def __init__(self, readers: int = DB_READER_CONNECTIONS):
+        self.reader_count = max(1, readers)
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._readers: Optional[asyncio.Queue] = None
+        self._all_readers: List[aiosqlite.Connection] = []
+        self._write_lock = asyncio.Lock()
+        self._open_lock = asyncio.Lock()
+        self.is_open = False
+
+    async def open(self):
+        """Open the writer and reader connections"""
+        async with self._open_lock:
+            if self.is_open:
+                return
+
+            try:
+                self._writer = await get_db()
+                # WAL is persistent on the file, so the readers pick it up too
+                cursor = await self._writer.execute("PRAGMA journal_mode = WAL")
+                await cursor.close()
+
+                self._readers = asyncio.Queue()
+                for _ in range(self.reader_count):
+                    reader = await get_db()
+                    self._all_readers.append(reader)
+                    await reader.execute("PRAGMA query_only = ON")
+                    self._readers.put_nowait(reader)
+            except BaseException:
+                # Don't leave half a pool (and its threads) behind
+                for db in [self._writer, *self._all_readers]:
+                    if db is not None:
+                        await db.close()
+                self._writer = None
+                self._all_readers = []
+                raise
+
+            self.is_open = True
+
+    async def close(self):
+        """Close every pooled connection"""
+        async with self._open_lock:
+            if not self.is_open:
+                return
+            self.is_open = False
+
+            async with self._write_lock:
+                await self._writer.close()
+                self._writer = None
+
+            for reader in self._all_readers:
+                await reader.close()
+            self._all_readers = []
+            self._readers = None
+
+    @asynccontextmanager
+    async def read(self):
+        """Borrow a reader connection"""
+        reader = await self._readers.get()
+        try:
+            yield reader
+        finally:
+            self._readers.put_nowait(reader)
+
+    @asynccontextmanager
+    async def write(self):
+        """Hold the writer for one transaction, committing on success"""
+        async with self._write_lock:
+            try:
+                yield self._writer
+                await self._writer.commit()
+            except BaseException:
+                await self._writer.rollback()
+                raise
+
+_pool: Optional[ConnectionPool] = None
+
+async def open_pool() -> ConnectionPool:
+    """Open the shared connection pool (called on app startup)"""
+    global _pool
+    if _pool is None:
+        _pool = ConnectionPool()
+    if not _pool.is_open:
+        await _pool.open()
+    return _pool
+
+async def close_pool():
+    """Close the shared connection pool (called on app shutdown)"""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+@asynccontextmanager
+async def read_connection():
+    """Pooled connection for read-only queries"""
+    pool = await open_pool()
+    async with pool.read() as db:
+        yield db
+
+@asynccontextmanager
+async def write_connection():
+    """Pooled writer connection wrapped in a single transaction"""
+    pool = await open_pool()
+    async with pool.write() as db:
+        yield db
+
 async def init_db():
     """Initialize database with schema"""
-    db = await get_db()
-    try:
+    async with write_connection() as db:
         # Create keywords table
         await db.execute("""
             CREATE TABLE IF NOT EXISTS keywords (
@@ -35,16 +260,37 @@ async def init_db():
                 sentiment_label VARCHAR(20),
                 sentiment_score FLOAT,
                 processing_status VARCHAR(20) DEFAULT 'pending',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                lease_expires_at REAL,
+                duplicate_of INTEGER
             )
         """)
 
+        # Columns added after the original schema
+        await _ensure_column(db, "posts", "lease_expires_at", "REAL")
+        await _ensure_column(db, "posts", "duplicate_of", "INTEGER")
+
         # Create indexes for posts
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_posts_timestamp ON posts(timestamp)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_posts_sentiment ON posts(sentiment_label)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_posts_keyword ON posts(keyword_matched)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_posts_status ON posts(processing_status)")
 
+        # Superseded by the partial feed indexes below and post_keywords; every
+        # processed post updates both sentiment_label and keyword_matched, so
+        # they weren't free
+        for name in (
+            "idx_posts_timestamp", "idx_posts_sentiment", "idx_posts_keyword",
+            "idx_posts_feed_keyword", "idx_posts_feed_keyword_sentiment"
+        ):
+            await db.execute(f"DROP INDEX IF EXISTS {name}")
+        for name, columns in FEED_INDEXES.items():
+            await db.execute(
+                f"""CREATE INDEX IF NOT EXISTS {name}
+                    ON posts({", ".join(columns + ("timestamp",))})
+                    WHERE processing_status = 'processed'"""
+            )
+
+        await _create_search_index(db)
+        await _create_post_keywords(db)
+
         # Create sentiment_trends table
         await db.execute("""
             CREATE TABLE IF NOT EXISTS sentiment_trends (
@@ -54,138 +300,855 @@ async def init_db():
                 positive_count INTEGER DEFAULT 0,
                 neutral_count INTEGER DEFAULT 0,
                 negative_count INTEGER DEFAULT 0,
+                duplicate_count INTEGER DEFAULT 0,
                 UNIQUE(hour_timestamp, keyword)
             )
         """)
+        await _ensure_column(db, "sentiment_trends", "duplicate_count", "INTEGER DEFAULT 0")
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_trends_keyword_hour ON sentiment_trends(keyword, hour_timestamp)"
+        )
 
-        await db.commit()
-    finally:
-        await db.close()
+        # Minute, 5-minute and day tiers (the hour tier is sentiment_trends)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS sentiment_rollups (
+                resolution VARCHAR(10) NOT NULL,
+                keyword VARCHAR(100) NOT NULL,
+                bucket_timestamp TIMESTAMP NOT NULL,
+                positive_count INTEGER DEFAULT 0,
+                neutral_count INTEGER DEFAULT 0,
+                negative_count INTEGER DEFAULT 0,
+                duplicate_count INTEGER DEFAULT 0,
+                PRIMARY KEY (resolution, keyword, bucket_timestamp)
+            ) WITHOUT ROWID
+        """)
+        await _ensure_column(db, "sentiment_rollups", "duplicate_count", "INTEGER DEFAULT 0")
+
+        # Catalog of archived post partitions (one SQLite file per period)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS post_partitions (
+                first_id INTEGER PRIMARY KEY,
+                last_id INTEGER NOT NULL,
+                period VARCHAR(20) NOT NULL,
+                period_start TIMESTAMP NOT NULL,
+                period_end TIMESTAMP NOT NULL,
+                path TEXT NOT NULL,
+                row_count INTEGER NOT NULL,
+                text_stripped BOOLEAN DEFAULT 0,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # ID ranges being archived: writes outside the claim/process path
+        # (keyword backfills) leave these posts alone until they're gone
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS archiving_ranges (
+                first_id INTEGER PRIMARY KEY,
+                last_id INTEGER NOT NULL
+            )
+        """)
+
+        # Named leases shared by every worker process (e.g. who runs the background processor)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS leases (
+                name VARCHAR(50) PRIMARY KEY,
+                holder TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+
+        # Cross-process event log, tailed by every worker (see event_bus.py)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS event_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic VARCHAR(50) NOT NULL,
+                data TEXT,
+                origin TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+
+        # Databases from before the rollup tiers existed start with an empty table
+        cursor = await db.execute("SELECT 1 FROM sentiment_rollups LIMIT 1")
+        if await cursor.fetchone() is None:
+            await _rebuild_rollups(db)
+
+async def _ensure_column(db, table: str, column: str, definition: str):
+    """Add a column to an existing table if it isn't there yet"""
+    cursor = await db.execute(f"PRAGMA table_info({table})")
+    columns = {row['name'] for row in await cursor.fetchall()}
+    if column not in columns:
+        await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+async def _create_search_index(db):
+    """
+    Full-text index over post text, kept in sync with posts by triggers
+
+    posts_fts is an external-content FTS5 table: it stores only the index
+    and reads text from posts, so the text isn't kept twice. Prefix indexes
+    on 2 and 3 characters keep prefix queries (tes*) from scanning every
+    term. Databases created before the index get it built once here.
+    """
+    cursor = await db.execute("SELECT 1 FROM sqlite_master WHERE name = 'posts_fts'")
+    exists = await cursor.fetchone() is not None
+
+    await db.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+            text,
+            content = 'posts',
+            content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+            INSERT INTO posts_fts (rowid, text) VALUES (new.id, new.text);
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+            INSERT INTO posts_fts (posts_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF text ON posts BEGIN
+            INSERT INTO posts_fts (posts_fts, rowid, text) VALUES ('delete', old.id, old.text);
+            INSERT INTO posts_fts (rowid, text) VALUES (new.id, new.text);
+        END
+    """)
+
+    if not exists:
+        await db.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+
+async def _create_post_keywords(db):
+    """
+    Every keyword each processed post matched, one row per (post, keyword)
+
+    posts.keyword_matched only holds the highest-priority match, so posts
+    mentioning several tracked keywords are counted under all of them
+    from here. The primary key orders each keyword's posts by time, so a
+    keyword's feed is one range scan; the sentiment index does the same
+    for one keyword and sentiment. Existing databases are seeded from
+    keyword_matched (earlier posts keep their single recorded match).
+    """
+    cursor = await db.execute("SELECT 1 FROM sqlite_master WHERE name = 'post_keywords'")
+    exists = await cursor.fetchone() is not None
+
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS post_keywords (
+            keyword VARCHAR(100) NOT NULL,
+            timestamp TIMESTAMP NOT NULL,
+            post_id INTEGER NOT NULL,
+            sentiment_label VARCHAR(20),
+            PRIMARY KEY (keyword, timestamp, post_id)
+        ) WITHOUT ROWID
+    """)
+    await db.execute(
+        """CREATE INDEX IF NOT EXISTS idx_post_keywords_sentiment
+           ON post_keywords(keyword, sentiment_label, timestamp)"""
+    )
+    await db.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_post_keywords_post ON post_keywords(post_id, keyword)"
+    )
+
+    if not exists:
+        await db.execute("""
+            INSERT INTO post_keywords (keyword, timestamp, post_id, sentiment_label)
+            SELECT keyword_matched, timestamp, id, sentiment_label FROM posts
+            WHERE processing_status = 'processed' AND keyword_matched IS NOT NULL
+        """)
+
+def _bucket_of(bucket: str, resolution: str) -> str:
+    """Bucket of a coarser tier containing a finer tier's bucket"""
+    if resolution == "minute":
+        return bucket[:16] + ":00"
+    if resolution == "5min":
+        return f"{bucket[:14]}{int(bucket[14:16]) // 5 * 5:02d}:00"
+    if resolution == "hour":
+        return bucket[:13] + ":00:00"
+    return bucket[:10] + " 00:00:00"
+
+def _rollup_tier(resolution: str) -> Tuple[str, str, str]:
+    """(table, bucket column, row filter) for a rollup tier"""
+    if resolution == "hour":
+        return "sentiment_trends", "hour_timestamp", "1"
+    return "sentiment_rollups", "bucket_timestamp", f"resolution = '{resolution}'"
+
+def _rollup_insert(resolution: str) -> Tuple[str, str]:
+    """
+    INSERT prefix for a tier taking (bucket, keyword, positive, neutral, negative, duplicates)
+
+    Returns the prefix and the SQL to append to the value list (the tier
+    name for tiers stored in sentiment_rollups).
+    """
+    if resolution == "hour":
+        return (
+            "INSERT INTO sentiment_trends "
+            "(hour_timestamp, keyword, positive_count, neutral_count, negative_count, duplicate_count)",
+            ""
+        )
+    return (
+        "INSERT INTO sentiment_rollups "
+        "(bucket_timestamp, keyword, positive_count, neutral_count, negative_count, duplicate_count, resolution)",
+        f", '{resolution}'"
+    )
+
+async def _rebuild_rollups(db):
+    """
+    Recompute every rollup tier: the minute tier from posts, then each coarser tier from the last
+
+    Only the hot posts table is read, so this is meant for databases
+    without archived partitions.
+    """
+    await db.execute("DELETE FROM sentiment_rollups")
+    await db.execute("DELETE FROM sentiment_trends")
+
+    insert, tier = _rollup_insert("minute")
+    await db.execute(f"""
+        {insert}
+        SELECT {MINUTE_BUCKET_SQL} AS bucket, keyword,
+               SUM(sentiment_label = 'POSITIVE'),
+               SUM(sentiment_label = 'NEUTRAL'),
+               SUM(sentiment_label = 'NEGATIVE'),
+               SUM(duplicate_of IS NOT NULL){tier}
+        FROM (
+            SELECT post_keywords.keyword, posts.timestamp, posts.created_at,
+                   posts.sentiment_label, posts.duplicate_of
+            FROM post_keywords
+            JOIN posts ON posts.id = post_keywords.post_id
+        )
+        GROUP BY bucket, keyword
+        UNION ALL
+        SELECT {MINUTE_BUCKET_SQL} AS bucket, ?,
+               SUM(sentiment_label = 'POSITIVE'),
+               SUM(sentiment_label = 'NEUTRAL'),
+               SUM(sentiment_label = 'NEGATIVE'),
+               SUM(duplicate_of IS NOT NULL){tier}
+        FROM posts
+        WHERE processing_status = 'processed'
+        GROUP BY bucket
+    """, (ALL_KEYWORDS,))
+
+    bucket_sql = {
+        "5min": "substr({0}, 1, 14) || printf('%02d:00', CAST(substr({0}, 15, 2) AS INTEGER) / 5 * 5)",
+        "hour": "substr({0}, 1, 13) || ':00:00'",
+        "day": "substr({0}, 1, 10) || ' 00:00:00'",
+    }
+    resolutions = list(ROLLUP_RESOLUTIONS)
+    for source, resolution in zip(resolutions, resolutions[1:]):
+        table, column, where = _rollup_tier(source)
+        insert, tier = _rollup_insert(resolution)
+        await db.execute(f"""
+            {insert}
+            SELECT {bucket_sql[resolution].format(column)} AS bucket, keyword,
+                   SUM(positive_count), SUM(neutral_count), SUM(negative_count),
+                   SUM(duplicate_count){tier}
+            FROM {table}
+            WHERE {where}
+            GROUP BY bucket, keyword
+        """)
+
+async def _bump_rollups(db, counts: Dict[Tuple[str, str], List[int]]):
+    """
+    Add sentiment counts to every rollup tier
+
+    Args:
+        counts: {(minute bucket, keyword): [positive, neutral, negative, duplicates]}
+    """
+    for resolution in ROLLUP_RESOLUTIONS:
+        # Roll the finer tier's deltas up into this tier's buckets
+        deltas = {}
+        for (bucket, keyword), values in counts.items():
+            total = deltas.setdefault((_bucket_of(bucket, resolution), keyword), [0, 0, 0, 0])
+            for index, value in enumerate(values):
+                total[index] += value
+        counts = deltas
+
+        insert, tier = _rollup_insert(resolution)
+        conflict = "hour_timestamp, keyword" if resolution == "hour" else "resolution, keyword, bucket_timestamp"
+        await db.executemany(
+            f"""{insert} VALUES (?, ?, ?, ?, ?, ?{tier})
+               ON CONFLICT({conflict}) DO UPDATE SET
+                   positive_count = positive_count + excluded.positive_count,
+                   neutral_count = neutral_count + excluded.neutral_count,
+                   negative_count = negative_count + excluded.negative_count,
+                   duplicate_count = duplicate_count + excluded.duplicate_count""",
+            [(bucket, keyword, *values) for (bucket, keyword), values in deltas.items()]
+        )
+
+def _result_keywords(result: Dict) -> List[str]:
+    """Every keyword a sentiment result matched (just keyword_matched if not given)"""
+    if result.get('keywords') is not None:
+        return result['keywords']
+    return [result['keyword_matched']] if result['keyword_matched'] else []
+
+def _count_sentiments(counts: Dict[Tuple[str, str], List[int]], bucket: str, keywords: List[str],
+                      sentiment_label: Optional[str], duplicate: bool):
+    """Add one post to the rollup deltas of each of `keywords` in its minute bucket"""
+    index = _SENTIMENT_COUNT_INDEX.get(sentiment_label)
+    for keyword in keywords:
+        values = counts.setdefault((bucket, keyword), [0, 0, 0, 0])
+        if index is not None:
+            values[index] += 1
+        if duplicate:
+            values[3] += 1
+
+async def _record_sentiments(db, results: List[Dict]):
+    """
+    Store sentiment results and bump the rollups in the caller's transaction
+
+    Each post is counted once in the all-keywords totals and once under
+    every keyword it matched (its 'keywords', or else keyword_matched),
+    and gets a post_keywords row per keyword. Rollups and post_keywords
+    are only added to for posts that weren't already processed, so
+    re-processing a post never counts it twice. Results with a
+    'duplicate_of' post ID are linked to that post and also counted as
+    duplicates.
+    """
+    # Minute bucket and timestamp of each post not processed yet (read before the update)
+    unprocessed = {}
+    post_ids = [r['post_id'] for r in results]
+    for start in range(0, len(post_ids), SQL_CHUNK_SIZE):
+        chunk = post_ids[start:start + SQL_CHUNK_SIZE]
+        placeholders = ",".join("?" * len(chunk))
+        cursor = await db.execute(
+            f"""SELECT id, {MINUTE_BUCKET_SQL}, timestamp FROM posts
+                WHERE id IN ({placeholders}) AND processing_status != 'processed'""",
+            chunk
+        )
+        unprocessed.update((row[0], (row[1], row[2])) for row in await cursor.fetchall())
+
+    counts = {}
+    links = []
+    relabeled = []
+    for r in results:
+        post = unprocessed.get(r['post_id'])
+        if post is None:
+            relabeled.append((r['sentiment_label'], r['post_id']))
+            continue
+        bucket, timestamp = post
+        keywords = _result_keywords(r)
+        _count_sentiments(
+            counts, bucket, [ALL_KEYWORDS] + keywords,
+            r['sentiment_label'], r.get('duplicate_of') is not None
+        )
+        links.extend((keyword, timestamp, r['post_id'], r['sentiment_label']) for keyword in keywords)
+
+    await db.executemany(
+        """UPDATE posts
+           SET sentiment_label = ?,
+               sentiment_score = ?,
+               keyword_matched = ?,
+               processing_status = 'processed',
+               lease_expires_at = NULL,
+               duplicate_of = ?
+           WHERE id = ?""",
+        [
+            (r['sentiment_label'], r['sentiment_score'], r['keyword_matched'],
+             r.get('duplicate_of'), r['post_id'])
+            for r in results
+        ]
+    )
+
+    await db.executemany(
+        """INSERT OR IGNORE INTO post_keywords (keyword, timestamp, post_id, sentiment_label)
+           VALUES (?, ?, ?, ?)""",
+        links
+    )
+    # Already processed posts keep their keywords; only the label can change
+    await db.executemany(
+        "UPDATE post_keywords SET sentiment_label = ? WHERE post_id = ?",
+        relabeled
+    )
+
+    if counts:
+        await _bump_rollups(db, counts)
 
 # Keyword operations
+@_timed
 async def add_keyword(keyword: str) -> int:
     """Add a new keyword to track"""
-    db = await get_db()
-    try:
+    async with write_connection() as db:
         cursor = await db.execute(
             "INSERT INTO keywords (keyword) VALUES (?)",
             (keyword.lower(),)
         )
-        await db.commit()
-        return cursor.lastrowid
-    finally:
-        await db.close()
+        keyword_id = cursor.lastrowid
+    bump_keywords_version()
+    return keyword_id
 
+@_timed
 async def get_keywords() -> List[Dict]:
     """Get all keywords"""
-    db = await get_db()
-    try:
+    async with read_connection() as db:
         cursor = await db.execute("SELECT * FROM keywords ORDER BY created_at DESC")
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
-    finally:
-        await db.close()
 
+@_timed
 async def delete_keyword(keyword_id: int) -> bool:
     """Delete a keyword"""
-    db = await get_db()
-    try:
+    async with write_connection() as db:
         await db.execute("DELETE FROM keywords WHERE id = ?", (keyword_id,))
-        await db.commit()
-        return True
-    finally:
-        await db.close()
+    bump_keywords_version()
+    return True
 
 # Post operations
+@_timed
 async def create_post(text: str, timestamp: str, source: str) -> int:
     """Create a new post"""
-    db = await get_db()
-    try:
+    async with write_connection() as db:
         cursor = await db.execute(
-            "INSERT INTO posts (text, timestamp, source) VALUES (?, ?, ?)",
+            f"INSERT INTO posts (text, timestamp, source, created_at) VALUES (?, ?, ?, {NOW_SQL})",
             (text, timestamp, source)
         )
-        await db.commit()
-        return cursor.lastrowid
-    finally:
-        await db.close()
+    POSTS_INGESTED.inc()
+    return cursor.lastrowid
+
+@_timed
+async def create_posts_bulk(posts: List[Dict]) -> List[int]:
+    """
+    Insert many posts in a single transaction
+
+    Args:
+        posts: List of dicts with text, timestamp and source
+
+    Returns:
+        list: IDs of the new posts, in input order
+    """
+    if not posts:
+        return []
+
+    async with write_connection() as db:
+        await db.executemany(
+            f"INSERT INTO posts (text, timestamp, source, created_at) VALUES (?, ?, ?, {NOW_SQL})",
+            [(post['text'], post['timestamp'], post['source']) for post in posts]
+        )
+        # We hold the only writer, so the new AUTOINCREMENT IDs are contiguous
+        cursor = await db.execute("SELECT last_insert_rowid()")
+        last_id = (await cursor.fetchone())[0]
 
+    POSTS_INGESTED.inc(len(posts))
+    first_id = last_id - len(posts) + 1
+    return list(range(first_id, last_id + 1))
+
+@_timed
 async def get_post(post_id: int) -> Optional[Dict]:
-    """Get a single post by ID"""
-    db = await get_db()
-    try:
+    """Get a single post by ID (from its archived partition if it's been moved)"""
+    async with read_connection() as db:
         cursor = await db.execute("SELECT * FROM posts WHERE id = ?", (post_id,))
         row = await cursor.fetchone()
-        return dict(row) if row else None
-    finally:
-        await db.close()
+    if row:
+        return dict(row)
 
+    archived = await _get_archived_posts([post_id])
+    return archived[0] if archived else None
+
+@_timed
+async def get_posts(post_ids: List[int]) -> List[Dict]:
+    """Get several posts by ID (missing IDs are skipped)"""
+    posts = []
+    async with read_connection() as db:
+        for start in range(0, len(post_ids), SQL_CHUNK_SIZE):
+            chunk = post_ids[start:start + SQL_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            cursor = await db.execute(
+                f"SELECT * FROM posts WHERE id IN ({placeholders}) ORDER BY id ASC",
+                chunk
+            )
+            rows = await cursor.fetchall()
+            posts.extend(dict(row) for row in rows)
+
+    if len(posts) < len(set(post_ids)):
+        found = {post['id'] for post in posts}
+        posts.extend(await _get_archived_posts([i for i in post_ids if i not in found]))
+        posts.sort(key=lambda post: post['id'])
+    return posts
+
+@_timed
 async def update_post_sentiment(
     post_id: int,
     sentiment_label: str,
     sentiment_score: float,
-    keyword_matched: Optional[str] = None
+    keyword_matched: Optional[str] = None,
+    duplicate_of: Optional[int] = None,
+    keywords: Optional[List[str]] = None
 ):
-    """Update post with sentiment analysis results"""
-    db = await get_db()
-    try:
-        await db.execute(
-            """UPDATE posts
-               SET sentiment_label = ?,
-                   sentiment_score = ?,
-                   keyword_matched = ?,
-                   processing_status = 'processed'
-               WHERE id = ?""",
-            (sentiment_label, sentiment_score, keyword_matched, post_id)
-        )
-        await db.commit()
-    finally:
-        await db.close()
+    """Update post with sentiment analysis results and the hourly rollups"""
+    async with write_connection() as db:
+        await _record_sentiments(db, [{
+            "post_id": post_id,
+            "sentiment_label": sentiment_label,
+            "sentiment_score": sentiment_score,
+            "keyword_matched": keyword_matched,
+            "duplicate_of": duplicate_of,
+            "keywords": keywords
+        }])
 
+@_timed
 async def mark_post_ignored(post_id: int):
     """Mark post as ignored (no keyword match)"""
-    db = await get_db()
-    try:
+    async with write_connection() as db:
         await db.execute(
-            "UPDATE posts SET processing_status = 'ignored' WHERE id = ?",
+            "UPDATE posts SET processing_status = 'ignored', lease_expires_at = NULL WHERE id = ?",
             (post_id,)
         )
-        await db.commit()
-    finally:
-        await db.close()
 
-async def get_pending_posts() -> List[Dict]:
-    """Get all pending posts"""
-    db = await get_db()
-    try:
+@_timed
+async def update_posts_sentiment_bulk(results: List[Dict]):
+    """
+    Store sentiment results for many posts in a single transaction
+
+    Args:
+        results: List of dicts with post_id, sentiment_label,
+                 sentiment_score, keyword_matched and optionally
+                 duplicate_of and keywords (every keyword matched)
+    """
+    if not results:
+        return
+
+    async with write_connection() as db:
+        await _record_sentiments(db, results)
+
+@_timed
+async def mark_posts_ignored(post_ids: List[int]):
+    """Mark many posts as ignored in a single transaction"""
+    if not post_ids:
+        return
+
+    async with write_connection() as db:
+        await db.executemany(
+            "UPDATE posts SET processing_status = 'ignored', lease_expires_at = NULL WHERE id = ?",
+            [(post_id,) for post_id in post_ids]
+        )
+
+@_timed
+async def get_pending_posts(limit: Optional[int] = None) -> List[Dict]:
+    """Get pending posts, oldest first"""
+    async with read_connection() as db:
         cursor = await db.execute(
-            "SELECT * FROM posts WHERE processing_status = 'pending' ORDER BY created_at ASC"
+            """SELECT * FROM posts
+               WHERE processing_status = 'pending'
+               ORDER BY id ASC
+               LIMIT ?""",
+            (limit if limit is not None else -1,)
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
-    finally:
-        await db.close()
 
-async def get_recent_posts(limit: int = 20) -> List[Dict]:
-    """Get recent processed posts"""
-    db = await get_db()
-    try:
+@_timed
+async def count_pending_posts() -> int:
+    """Number of posts waiting to be processed"""
+    async with read_connection() as db:
         cursor = await db.execute(
-            """SELECT * FROM posts
-               WHERE processing_status = 'processed'
-               ORDER BY timestamp DESC
+            "SELECT COUNT(*) FROM posts WHERE processing_status = 'pending'"
+        )
+        return (await cursor.fetchone())[0]
+
+@_timed
+async def claim_pending_posts(limit: int, lease_seconds: float) -> List[Dict]:
+    """
+    Atomically claim up to `limit` posts for processing
+
+    Claims pending posts plus any 'processing' posts whose lease has expired
+    (their worker crashed or stalled). Claimed posts are marked 'processing'
+    with a lease expiry so no other worker picks them up meanwhile.
+
+    Returns:
+        list: Claimed posts, oldest first
+    """
+    now = time.time()
+    async with write_connection() as db:
+        cursor = await db.execute(
+            """UPDATE posts
+               SET processing_status = 'processing', lease_expires_at = ?
+               WHERE id IN (
+                   SELECT id FROM posts WHERE processing_status = 'pending'
+                   UNION ALL
+                   SELECT id FROM posts
+                   WHERE processing_status = 'processing' AND lease_expires_at < ?
+                   ORDER BY id
+                   LIMIT ?
+               )
+               RETURNING *""",
+            (now + lease_seconds, now, limit)
+        )
+        rows = await cursor.fetchall()
+
+    return sorted((dict(row) for row in rows), key=lambda post: post['id'])
+
+@_timed
+async def claim_posts(post_ids: List[int], lease_seconds: float) -> List[Dict]:
+    """
+    Atomically claim specific posts for processing
+
+    Posts that are already processed, ignored or leased to another worker
+    are left alone and missing from the result.
+    """
+    now = time.time()
+    claimed = []
+    async with write_connection() as db:
+        for start in range(0, len(post_ids), SQL_CHUNK_SIZE):
+            chunk = post_ids[start:start + SQL_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            cursor = await db.execute(
+                f"""UPDATE posts
+                    SET processing_status = 'processing', lease_expires_at = ?
+                    WHERE id IN ({placeholders})
+                      AND (processing_status = 'pending'
+                           OR (processing_status = 'processing' AND lease_expires_at < ?))
+                    RETURNING *""",
+                (now + lease_seconds, *chunk, now)
+            )
+            claimed.extend(dict(row) for row in await cursor.fetchall())
+
+    return sorted(claimed, key=lambda post: post['id'])
+
+@_timed
+async def find_posts_matching(match_query: str, after_id: int, until_id: int, limit: int) -> List[Dict]:
+    """
+    Ignored and processed posts whose text matches a full-text query, by id
+
+    Used to find posts a newly added keyword may match without scanning
+    the whole table: the FTS index yields candidate ids in order and only
+    those rows are read.
+
+    Args:
+        match_query: FTS5 query for the keyword
+        after_id: Only posts with id > after_id (keyset for the next page)
+        until_id: Only posts with id <= until_id
+        limit: Max posts to return
+
+    Returns:
+        list: Dicts with id, text and processing_status, oldest first
+    """
+    async with read_connection() as db:
+        cursor = await db.execute(
+            """SELECT posts.id, posts.text, posts.processing_status
+               FROM posts_fts
+               JOIN posts ON posts.id = posts_fts.rowid
+               WHERE posts_fts MATCH ?
+                 AND posts_fts.rowid > ? AND posts_fts.rowid <= ?
+                 AND posts.processing_status IN ('ignored', 'processed')
+               ORDER BY posts_fts.rowid
                LIMIT ?""",
-            (limit,)
+            (match_query, after_id, until_id, limit)
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
-    finally:
-        await db.close()
 
+@_timed
+async def add_post_keyword(keyword: str, post_ids: List[int]) -> int:
+    """
+    Count already processed posts under one more keyword
+
+    For a keyword added after the posts were classified: their sentiment
+    stays as it is, they just get a post_keywords row and are added to
+    the keyword's rollups. Posts already linked to the keyword, or being
+    archived, are left alone, so this is safe to repeat.
+
+    Returns:
+        int: Posts newly linked to the keyword
+    """
+    counts = {}
+    linked = 0
+    async with write_connection() as db:
+        for start in range(0, len(post_ids), SQL_CHUNK_SIZE):
+            chunk = post_ids[start:start + SQL_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            cursor = await db.execute(
+                f"""INSERT INTO post_keywords (keyword, timestamp, post_id, sentiment_label)
+                    SELECT ?, timestamp, id, sentiment_label FROM posts
+                    WHERE id IN ({placeholders}) AND processing_status = 'processed'
+                      AND NOT EXISTS (SELECT 1 FROM archiving_ranges WHERE posts.id BETWEEN first_id AND last_id)
+                    ON CONFLICT DO NOTHING
+                    RETURNING post_id""",
+                (keyword, *chunk)
+            )
+            new_ids = [row[0] for row in await cursor.fetchall()]
+            if not new_ids:
+                continue
+            linked += len(new_ids)
+
+            placeholders = ",".join("?" * len(new_ids))
+            cursor = await db.execute(
+                f"""SELECT {MINUTE_BUCKET_SQL}, sentiment_label, duplicate_of FROM posts
+                    WHERE id IN ({placeholders})""",
+                new_ids
+            )
+            for bucket, sentiment_label, duplicate_of in await cursor.fetchall():
+                _count_sentiments(counts, bucket, [keyword], sentiment_label, duplicate_of is not None)
+
+        if counts:
+            await _bump_rollups(db, counts)
+    return linked
+
+@_timed
+async def get_last_post_id() -> int:
+    """Highest post id in the hot table (0 if empty)"""
+    async with read_connection() as db:
+        cursor = await db.execute("SELECT COALESCE(MAX(id), 0) FROM posts")
+        return (await cursor.fetchone())[0]
+
+@_timed
+async def claim_ignored_posts(post_ids: List[int], lease_seconds: float) -> List[Dict]:
+    """
+    Atomically claim ignored posts for processing again
+
+    Same as claim_posts, but for posts that were ignored (for example
+    because the keyword they match didn't exist yet). Posts that are no
+    longer ignored, or are being archived, are left alone and missing
+    from the result.
+    """
+    now = time.time()
+    claimed = []
+    async with write_connection() as db:
+        for start in range(0, len(post_ids), SQL_CHUNK_SIZE):
+            chunk = post_ids[start:start + SQL_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            cursor = await db.execute(
+                f"""UPDATE posts
+                    SET processing_status = 'processing', lease_expires_at = ?
+                    WHERE id IN ({placeholders}) AND processing_status = 'ignored'
+                      AND NOT EXISTS (SELECT 1 FROM archiving_ranges WHERE posts.id BETWEEN first_id AND last_id)
+                    RETURNING *""",
+                (now + lease_seconds, *chunk)
+            )
+            claimed.extend(dict(row) for row in await cursor.fetchall())
+
+    return sorted(claimed, key=lambda post: post['id'])
+
+def _feed_index(columns: List[str]) -> str:
+    """
+    The FEED_INDEXES entry covering the most of the filtered columns
+
+    Ties go to the earlier entry, so sentiment + source seeks on the
+    sentiment index and filters source from there.
+    """
+    usable = [
+        (len(indexed), -position, name)
+        for position, (name, indexed) in enumerate(FEED_INDEXES.items())
+        if set(indexed) <= set(columns)
+    ]
+    return max(usable)[2]
+
+@_timed
+async def get_recent_posts(
+    limit: int = 20,
+    keyword: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    source: Optional[str] = None,
+    before: Optional[Tuple[str, int]] = None
+) -> List[Dict]:
+    """
+    Get recent processed posts, newest first
+
+    Pages with a keyset on (timestamp, id) rather than OFFSET: pass the
+    (timestamp, id) of the last post of one page as `before` to get the
+    next, which costs the same however far back it is. The unfiltered feed
+    and sentiment or source alone have their own partial index (see
+    FEED_INDEXES); sentiment + source seeks on the sentiment index and
+    filters the rest. Keyword feeds are a range scan of post_keywords.
+    Only the hot table is paged; archived partitions aren't part of the
+    feed.
+
+    Args:
+        limit: Max posts to return
+        keyword: Only posts matching this keyword (as any of their matches)
+        sentiment: Only posts with this label (POSITIVE, NEUTRAL or NEGATIVE)
+        source: Only posts from this source
+        before: Only posts strictly older than this (timestamp, id)
+
+    Returns:
+        list: Posts, each with the `keywords` it matched
+    """
+    sentiment = sentiment.upper() if sentiment else None
+    async with read_connection() as db:
+        if keyword:
+            posts = await _get_recent_keyword_posts(db, limit, keyword.lower(), sentiment, source, before)
+        else:
+            posts = await _get_recent_all_posts(db, limit, sentiment, source, before)
+    for post in posts:
+        _split_keywords(post)
+    return posts
+
+async def _get_recent_all_posts(
+    db,
+    limit: int,
+    sentiment: Optional[str],
+    source: Optional[str],
+    before: Optional[Tuple[str, int]]
+) -> List[Dict]:
+    """Feed page over every keyword, walking the matching FEED_INDEXES entry"""
+    conditions = ["processing_status = 'processed'"]
+    params = []
+    columns = []
+    for name, value in {"sentiment": sentiment, "source": source}.items():
+        if value is not None:
+            columns.append(FEED_FILTERS[name])
+            conditions.append(f"{FEED_FILTERS[name]} = ?")
+            params.append(value)
+    if before is not None:
+        conditions.append("(timestamp, id) < (?, ?)")
+        params.extend(before)
+
+    cursor = await db.execute(
+        # Without ANALYZE stats the planner can prefer idx_posts_status
+        # and sort every processed post, so name the matching index
+        f"""SELECT *, {POST_KEYWORDS_SQL} FROM posts INDEXED BY {_feed_index(columns)}
+            WHERE {" AND ".join(conditions)}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ?""",
+        params + [limit]
+    )
+    return [dict(row) for row in await cursor.fetchall()]
+
+async def _get_recent_keyword_posts(
+    db,
+    limit: int,
+    keyword: str,
+    sentiment: Optional[str],
+    source: Optional[str],
+    before: Optional[Tuple[str, int]]
+) -> List[Dict]:
+    """Feed page for one keyword, walking post_keywords newest first"""
+    conditions = ["post_keywords.keyword = ?"]
+    params: List = [keyword]
+    if sentiment is not None:
+        conditions.append("post_keywords.sentiment_label = ?")
+        params.append(sentiment)
+    if source is not None:
+        conditions.append("posts.source = ?")
+        params.append(source)
+    if before is not None:
+        conditions.append("(post_keywords.timestamp, post_keywords.post_id) < (?, ?)")
+        params.extend(before)
+    # Unfiltered keyword feeds walk the primary key (keyword, timestamp,
+    # post_id), which the planner picks by itself; with a sentiment filter
+    # it has to be steered to the (keyword, sentiment_label, timestamp) index
+    hint = "INDEXED BY idx_post_keywords_sentiment" if sentiment is not None else ""
+
+    cursor = await db.execute(
+        f"""SELECT posts.*, {POST_KEYWORDS_SQL} FROM post_keywords {hint}
+            JOIN posts ON posts.id = post_keywords.post_id
+            WHERE {" AND ".join(conditions)}
+            ORDER BY post_keywords.timestamp DESC, post_keywords.post_id DESC
+            LIMIT ?""",
+        params + [limit]
+    )
+    return [dict(row) for row in await cursor.fetchall()]
+
+def _split_keywords(post: Dict):
+    """Turn the POST_KEYWORDS_SQL column into a list, the post's keyword_matched first"""
+    keywords = post['keywords'].split(KEYWORD_SEPARATOR) if post['keywords'] else []
+    keywords.sort(key=lambda keyword: keyword != post['keyword_matched'])
+    post['keywords'] = keywords
+
+@_timed
 async def get_newly_processed_posts(since_id: int = 0) -> List[Dict]:
     """Get newly processed posts since a given ID"""
-    db = await get_db()
-    try:
+    async with read_connection() as db:
         cursor = await db.execute(
             """SELECT * FROM posts
                WHERE processing_status = 'processed' AND id > ?
@@ -194,66 +1157,521 @@ async def get_newly_processed_posts(since_id: int = 0) -> List[Dict]:
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
-    finally:
-        await db.close()
 
 # Dashboard statistics
-async def get_dashboard_stats() -> Dict:
-    """Get dashboard statistics"""
-    db = await get_db()
-    try:
-        # Total mentions
+@_timed
+async def get_dashboard_stats(keyword: Optional[str] = None) -> Dict:
+    """
+    Get dashboard statistics from the hourly rollups
+
+    Args:
+        keyword: Only posts matching this keyword, or None for all posts
+    """
+    async with read_connection() as db:
         cursor = await db.execute(
-            "SELECT COUNT(*) as total FROM posts WHERE processing_status = 'processed'"
+            """SELECT COALESCE(SUM(positive_count), 0) as positive,
+                      COALESCE(SUM(neutral_count), 0) as neutral,
+                      COALESCE(SUM(negative_count), 0) as negative,
+                      COALESCE(SUM(duplicate_count), 0) as duplicates
+               FROM sentiment_trends
+               WHERE keyword = ?""",
+            (keyword.lower() if keyword else ALL_KEYWORDS,)
         )
-        total_row = await cursor.fetchone()
-        total_mentions = total_row['total']
+        row = await cursor.fetchone()
+        return _stats_from_row(row)
+
+def _stats_from_row(row) -> Dict:
+    sentiment_breakdown = {
+        "positive": row['positive'],
+        "neutral": row['neutral'],
+        "negative": row['negative']
+    }
+    return {
+        "total_mentions": sum(sentiment_breakdown.values()),
+        "sentiment_breakdown": sentiment_breakdown,
+        # Mentions that reused a near-identical post's sentiment
+        "duplicates": row['duplicates']
+    }
+
+@_timed
+async def get_keyword_stats() -> List[Dict]:
+    """
+    Dashboard statistics for every tracked keyword, most mentioned first
 
-        # Sentiment breakdown
+    A post matching several keywords counts once under each of them, so
+    the keywords' totals can add up to more than the overall total.
+    """
+    async with read_connection() as db:
         cursor = await db.execute(
-            """SELECT sentiment_label, COUNT(*) as count
-               FROM posts
-               WHERE processing_status = 'processed'
-               GROUP BY sentiment_label"""
-        )
-        sentiment_rows = await cursor.fetchall()
-
-        sentiment_breakdown = {
-            "positive": 0,
-            "neutral": 0,
-            "negative": 0
-        }
-
-        for row in sentiment_rows:
-            if row['sentiment_label']:
-                label = row['sentiment_label'].lower()
-                sentiment_breakdown[label] = row['count']
-
-        return {
-            "total_mentions": total_mentions,
-            "sentiment_breakdown": sentiment_breakdown
-        }
-    finally:
-        await db.close()
+            """SELECT keywords.keyword,
+                      COALESCE(SUM(positive_count), 0) as positive,
+                      COALESCE(SUM(neutral_count), 0) as neutral,
+                      COALESCE(SUM(negative_count), 0) as negative,
+                      COALESCE(SUM(duplicate_count), 0) as duplicates
+               FROM keywords
+               LEFT JOIN sentiment_trends ON sentiment_trends.keyword = keywords.keyword
+               GROUP BY keywords.keyword"""
+        )
+        rows = await cursor.fetchall()
+
+    stats = [{"keyword": row['keyword'], **_stats_from_row(row)} for row in rows]
+    stats.sort(key=lambda entry: entry["total_mentions"], reverse=True)
+    return stats
 
+@_timed
 async def get_hourly_trends(hours: int = 24) -> List[Dict]:
-    """Get hourly sentiment trends"""
-    db = await get_db()
-    try:
+    """Get hourly sentiment trends from the hourly rollups"""
+    async with read_connection() as db:
         cursor = await db.execute(
-            """SELECT
-                   strftime('%Y-%m-%d %H:00:00', timestamp) as hour,
-                   SUM(CASE WHEN sentiment_label = 'POSITIVE' THEN 1 ELSE 0 END) as positive,
-                   SUM(CASE WHEN sentiment_label = 'NEUTRAL' THEN 1 ELSE 0 END) as neutral,
-                   SUM(CASE WHEN sentiment_label = 'NEGATIVE' THEN 1 ELSE 0 END) as negative
-               FROM posts
-               WHERE processing_status = 'processed'
-                 AND timestamp >= datetime('now', '-' || ? || ' hours')
-               GROUP BY hour
-               ORDER BY hour ASC""",
-            (hours,)
+            """SELECT hour_timestamp as hour,
+                      positive_count as positive,
+                      neutral_count as neutral,
+                      negative_count as negative
+               FROM sentiment_trends
+               WHERE keyword = ?
+                 AND hour_timestamp >= strftime('%Y-%m-%d %H:00:00', 'now', '-' || ? || ' hours')
+               ORDER BY hour_timestamp ASC""",
+            (ALL_KEYWORDS, hours)
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
+
+def _to_naive_utc(moment: datetime) -> datetime:
+    """Buckets are naive timestamps; aware datetimes are converted to UTC first"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+@_timed
+async def get_sentiment_trends(
+    resolution: str,
+    start: datetime,
+    end: datetime,
+    keyword: Optional[str] = None
+) -> List[Dict]:
+    """
+    Get sentiment counts per bucket from the rollup tier for `resolution`
+
+    Args:
+        resolution: "minute", "5min", "hour" or "day"
+        start: Start of the range (the bucket containing it is included)
+        end: End of the range (exclusive)
+        keyword: Only posts matching this keyword, or None for all posts
+
+    Raises:
+        ValueError: Unknown resolution, empty range, or more than
+                    TRENDS_MAX_POINTS buckets
+    """
+    if resolution not in ROLLUP_RESOLUTIONS:
+        raise ValueError(
+            f"Unknown resolution '{resolution}' (choose from: {', '.join(ROLLUP_RESOLUTIONS)})"
+        )
+    start, end = _to_naive_utc(start), _to_naive_utc(end)
+    if start >= end:
+        raise ValueError("start must be before end")
+    points = (end - start).total_seconds() / ROLLUP_RESOLUTIONS[resolution]
+    if points > TRENDS_MAX_POINTS:
+        raise ValueError(
+            f"Range covers {int(points)} {resolution} buckets (max {TRENDS_MAX_POINTS}); "
+            "use a coarser resolution or a shorter range"
+        )
+
+    table, column, where = _rollup_tier(resolution)
+    first_bucket = _bucket_of(start.strftime(BUCKET_FORMAT), resolution)
+
+    async with read_connection() as db:
+        cursor = await db.execute(
+            f"""SELECT {column} as bucket,
+                       positive_count as positive,
+                       neutral_count as neutral,
+                       negative_count as negative,
+                       duplicate_count as duplicates
+                FROM {table}
+                WHERE {where} AND keyword = ? AND {column} >= ? AND {column} < ?
+                ORDER BY {column} ASC""",
+            (keyword.lower() if keyword else ALL_KEYWORDS, first_bucket, end.strftime(BUCKET_FORMAT))
+        )
+        rows = await cursor.fetchall()
+        return [dict(row) for row in rows]
+
+# Full-text search
+
+@_timed
+async def search_posts(
+    query: str,
+    limit: int = 20,
+    offset: int = 0,
+    sentiment: Optional[str] = None,
+    keyword: Optional[str] = None,
+    source: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> List[Dict]:
+    """
+    Full-text search over post text, best matches first
+
+    `query` uses FTS5 syntax: words (all must match), "exact phrases",
+    prefixes (tes*), OR, NOT and parentheses. Matching ignores case and
+    accents. Only the hot posts table is searched.
+
+    Args:
+        query: FTS5 query
+        limit: Max posts to return
+        offset: Matches to skip, for paging through results
+        sentiment: Only posts with this label
+        keyword: Only posts matching this keyword (as any of their matches)
+        source: Only posts from this source
+        start: Only posts with timestamp >= start
+        end: Only posts with timestamp < end
+
+    Returns:
+        list: Posts with a bm25 `rank` (lower is better) and a `snippet`
+              with the matching terms wrapped in <mark> tags
+
+    Raises:
+        ValueError: If the query isn't valid FTS5 syntax
+    """
+    conditions = ["posts_fts MATCH ?"]
+    params: List = [query]
+    for column, value in (
+        ("posts.sentiment_label", sentiment.upper() if sentiment else None),
+        ("posts.source", source),
+    ):
+        if value is not None:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+    if keyword:
+        conditions.append(
+            "EXISTS (SELECT 1 FROM post_keywords WHERE post_id = posts.id AND keyword = ?)"
+        )
+        params.append(keyword.lower())
+    # Post timestamps are stored as naive ISO 8601 strings
+    if start is not None:
+        conditions.append("posts.timestamp >= ?")
+        params.append(_to_naive_utc(start).isoformat())
+    if end is not None:
+        conditions.append("posts.timestamp < ?")
+        params.append(_to_naive_utc(end).isoformat())
+
+    async with read_connection() as db:
+        try:
+            cursor = await db.execute(
+                f"""SELECT posts.*,
+                           bm25(posts_fts) AS rank,
+                           snippet(posts_fts, 0, '<mark>', '</mark>', '…', 16) AS snippet
+                    FROM posts_fts
+                    JOIN posts ON posts.id = posts_fts.rowid
+                    WHERE {" AND ".join(conditions)}
+                    ORDER BY rank
+                    LIMIT ? OFFSET ?""",
+                params + [limit, offset]
+            )
+            rows = await cursor.fetchall()
+        except aiosqlite.OperationalError as e:
+            # fts5 reports query syntax errors (unbalanced quotes, stray operators) this way
+            raise ValueError(f"Invalid search query: {e}")
+        return [dict(row) for row in rows]
+
+# Archived post partitions
+
+def _partition_uri(path: str) -> str:
+    """Read-only URI for an archived partition (immutable: it never changes)"""
+    return f"{pathlib.Path(path).absolute().as_uri()}?mode=ro&immutable=1"
+
+async def _get_archived_posts(post_ids: List[int]) -> List[Dict]:
+    """Look posts up in the archived partitions covering their IDs"""
+    if not post_ids:
+        return []
+
+    async with read_connection() as db:
+        cursor = await db.execute("SELECT first_id, last_id, path FROM post_partitions ORDER BY first_id")
+        partitions = await cursor.fetchall()
+        if not partitions:
+            return []
+
+        # Group the wanted IDs by the partition holding them
+        wanted: Dict[str, List[int]] = {}
+        for post_id in sorted(set(post_ids)):
+            for partition in partitions:
+                if partition['first_id'] <= post_id <= partition['last_id']:
+                    wanted.setdefault(partition['path'], []).append(post_id)
+                    break
+
+        posts = []
+        for path, ids in wanted.items():
+            if not os.path.exists(path):
+                continue
+            await db.execute("ATTACH DATABASE ? AS archived", (_partition_uri(path),))
+            try:
+                for start in range(0, len(ids), SQL_CHUNK_SIZE):
+                    chunk = ids[start:start + SQL_CHUNK_SIZE]
+                    placeholders = ",".join("?" * len(chunk))
+                    async with db.execute(
+                        # SELECT * since partitions from before duplicate_of lack it
+                        f"""SELECT *, NULL AS lease_expires_at
+                            FROM archived.posts WHERE id IN ({placeholders})""",
+                        chunk
+                    ) as cursor:
+                        for row in await cursor.fetchall():
+                            post = dict(row)
+                            post.setdefault("duplicate_of", None)
+                            posts.append(post)
+            finally:
+                await db.execute("DETACH DATABASE archived")
+
+    return posts
+
+@_timed
+async def get_post_partitions() -> List[Dict]:
+    """Archived partitions, oldest first"""
+    async with read_connection() as db:
+        cursor = await db.execute("SELECT * FROM post_partitions ORDER BY first_id ASC")
+        rows = await cursor.fetchall()
+        return [dict(row) for row in rows]
+
+async def get_oldest_post(after_id: int = 0) -> Optional[Dict]:
+    """ID and created_at of the first hot post after `after_id`"""
+    async with read_connection() as db:
+        cursor = await db.execute(
+            "SELECT id, created_at FROM posts WHERE id > ? ORDER BY id ASC LIMIT 1",
+            (after_id,)
+        )
+        row = await cursor.fetchone()
+        return dict(row) if row else None
+
+async def find_last_post_created_before(moment: str, after_id: int = 0) -> Optional[int]:
+    """
+    ID of the last hot post after `after_id` created before `moment`
+
+    Binary search over the primary key instead of an index on created_at:
+    IDs are handed out in ingest order, so created_at grows with them.
+    """
+    async with read_connection() as db:
+        cursor = await db.execute("SELECT MAX(id) FROM posts")
+        max_id = (await cursor.fetchone())[0]
+        if max_id is None or max_id <= after_id:
+            return None
+
+        # Smallest ID from which every post was created at or after `moment`
+        low, high = after_id + 1, max_id + 1
+        while low < high:
+            middle = (low + high) // 2
+            cursor = await db.execute(
+                "SELECT id, created_at FROM posts WHERE id >= ? ORDER BY id ASC LIMIT 1",
+                (middle,)
+            )
+            row = await cursor.fetchone()
+            if row is None or row['created_at'] >= moment:
+                high = middle
+            else:
+                low = row['id'] + 1
+
+        cursor = await db.execute(
+            "SELECT MAX(id) FROM posts WHERE id > ? AND id < ?", (after_id, low)
+        )
+        return (await cursor.fetchone())[0]
+
+@_timed
+async def fence_post_range(first_id: int, last_id: int):
+    """
+    Mark an ID range as being archived
+
+    From the commit on, keyword backfills no longer claim or link posts
+    in the range, so nothing changes them between the copy to a
+    partition and the delete. Changes committed before it are seen by
+    count_unfinished_posts (claims) or copied (links).
+    """
+    async with write_connection() as db:
+        await db.execute(
+            "INSERT OR REPLACE INTO archiving_ranges (first_id, last_id) VALUES (?, ?)",
+            (first_id, last_id)
+        )
+
+@_timed
+async def unfence_post_range(first_id: int):
+    """Lift the fence once a range is archived (or archiving it was put off)"""
+    async with write_connection() as db:
+        await db.execute("DELETE FROM archiving_ranges WHERE first_id = ?", (first_id,))
+
+async def count_unfinished_posts(first_id: int, last_id: int) -> int:
+    """
+    Posts in an ID range that are still unfinished (and so can't be archived)
+
+    Claimed posts count too: their worker writes the result back to the
+    hot row, which must still be there.
+    """
+    async with read_connection() as db:
+        cursor = await db.execute(
+            """SELECT COUNT(*) FROM posts
+               WHERE processing_status IN ('pending', 'processing') AND id BETWEEN ? AND ?""",
+            (first_id, last_id)
+        )
+        return (await cursor.fetchone())[0]
+
+async def copy_posts_to_partition(path: str, first_id: int, last_id: int, strip_text: bool = False) -> int:
+    """
+    Write hot posts in an ID range to a new, compacted partition file
+
+    The copy reads the hot database through a separate read-only
+    connection, so it never holds the write lock. Stripping replaces the
+    post text with '' (sentiment, keyword and rollups are kept).
+
+    Returns:
+        int: Rows copied
+    """
+    hot_uri = f"{pathlib.Path(DATABASE_PATH).absolute().as_uri()}?mode=ro"
+    db = await aiosqlite.connect(path, uri=True)
+    try:
+        await db.execute(f"""
+            CREATE TABLE posts (
+                id INTEGER PRIMARY KEY,
+                text TEXT NOT NULL,
+                timestamp TIMESTAMP NOT NULL,
+                source VARCHAR(50) NOT NULL,
+                keyword_matched VARCHAR(100),
+                sentiment_label VARCHAR(20),
+                sentiment_score FLOAT,
+                processing_status VARCHAR(20),
+                created_at TIMESTAMP,
+                duplicate_of INTEGER
+            )
+        """)
+        await db.execute("ATTACH DATABASE ? AS hot", (hot_uri,))
+        cursor = await db.execute(
+            f"""INSERT INTO posts ({ARCHIVED_POST_COLUMNS})
+                SELECT {ARCHIVED_POST_COLUMNS} FROM hot.posts WHERE id BETWEEN ? AND ?""",
+            (first_id, last_id)
+        )
+        copied = cursor.rowcount
+        if strip_text:
+            await db.execute("UPDATE posts SET text = ''")
+        await db.commit()
+        await db.execute("DETACH DATABASE hot")
+        await db.execute("VACUUM")
     finally:
         await db.close()
+    return copied
+
+@_timed
+async def register_post_partition(partition: Dict):
+    """Add an archived partition to the catalog"""
+    async with write_connection() as db:
+        await db.execute(
+            """INSERT INTO post_partitions
+                   (first_id, last_id, period, period_start, period_end, path, row_count, text_stripped)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            (partition['first_id'], partition['last_id'], partition['period'],
+             partition['period_start'], partition['period_end'], partition['path'],
+             partition['row_count'], partition['text_stripped'])
+        )
+
+async def delete_hot_posts(first_id: int, last_id: int) -> int:
+    """
+    Remove an archived ID range from the hot posts table
+
+    Deletes in short transactions (ARCHIVE_DELETE_CHUNK rows) so ingest
+    isn't blocked behind one big delete; the freed pages are reused by new
+    posts. The total cost still grows with the rows archived, since each
+    one is removed from every index of the hot table.
+    """
+    deleted = 0
+    for start in range(first_id, last_id + 1, ARCHIVE_DELETE_CHUNK):
+        end = min(start + ARCHIVE_DELETE_CHUNK - 1, last_id)
+        async with write_connection() as db:
+            cursor = await db.execute("DELETE FROM posts WHERE id BETWEEN ? AND ?", (start, end))
+            deleted += cursor.rowcount
+            await db.execute("DELETE FROM post_keywords WHERE post_id BETWEEN ? AND ?", (start, end))
+        await asyncio.sleep(0)
+    return deleted
+
+@_timed
+async def remove_post_partition(first_id: int):
+    """Drop an archived partition from the catalog (its file is removed by the caller)"""
+    async with write_connection() as db:
+        await db.execute("DELETE FROM post_partitions WHERE first_id = ?", (first_id,))
+
+# Worker coordination
+
+@_timed
+async def acquire_lease(name: str, holder: str, ttl: float) -> bool:
+    """
+    Take or renew a named lease for `ttl` seconds
+
+    Succeeds if nobody holds the lease, it has expired, or `holder`
+    already holds it (a renewal).
+
+    Returns:
+        bool: Whether `holder` now holds the lease
+    """
+    now = time.time()
+    async with write_connection() as db:
+        cursor = await db.execute(
+            """INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?)
+               ON CONFLICT(name) DO UPDATE SET
+                   holder = excluded.holder,
+                   expires_at = excluded.expires_at
+               WHERE leases.holder = excluded.holder OR leases.expires_at < ?
+               RETURNING holder""",
+            (name, holder, now + ttl, now)
+        )
+        return await cursor.fetchone() is not None
+
+@_timed
+async def release_lease(name: str, holder: str):
+    """Give up a lease early (no-op if `holder` doesn't hold it)"""
+    async with write_connection() as db:
+        await db.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
+
+@_timed
+async def get_lease_holder(name: str) -> Optional[str]:
+    """Current holder of an unexpired lease, or None"""
+    async with read_connection() as db:
+        cursor = await db.execute(
+            "SELECT holder FROM leases WHERE name = ? AND expires_at >= ?",
+            (name, time.time())
+        )
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+@_timed
+async def append_events(events: List[Tuple[str, Optional[str], str]]):
+    """
+    Add events to the shared event log in one transaction
+
+    Args:
+        events: (topic, JSON data or None, origin) tuples
+    """
+    if not events:
+        return
+
+    now = time.time()
+    async with write_connection() as db:
+        await db.executemany(
+            "INSERT INTO event_log (topic, data, origin, created_at) VALUES (?, ?, ?, ?)",
+            [(topic, data, origin, now) for topic, data, origin in events]
+        )
+
+@_timed
+async def read_events(after_id: int, limit: int) -> List[Dict]:
+    """Events logged after `after_id`, oldest first"""
+    async with read_connection() as db:
+        cursor = await db.execute(
+            "SELECT id, topic, data, origin FROM event_log WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit)
+        )
+        rows = await cursor.fetchall()
+        return [dict(row) for row in rows]
+
+@_timed
+async def get_last_event_id() -> int:
+    """ID of the newest logged event (0 if none)"""
+    async with read_connection() as db:
+        cursor = await db.execute("SELECT COALESCE(MAX(id), 0) FROM event_log")
+        return (await cursor.fetchone())[0]
+
+@_timed
+async def prune_events(older_than: float) -> int:
+    """Delete events logged before the Unix time `older_than`"""
+    async with write_connection() as db:
+        cursor = await db.execute("DELETE FROM event_log WHERE created_at < ?", (older_than,))
+        return cursor.rowcount
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import os
+from collections import deque
+from typing import List, Optional, Set
+
+# Per-client buffer and shared replay ring sizes (in events)
+SSE_SUBSCRIBER_BUFFER = int(os.getenv("SSE_SUBSCRIBER_BUFFER", "256"))
+SSE_REPLAY_SIZE = int(os.getenv("SSE_REPLAY_SIZE", "1024"))
+
+def format_sse(event_id: int, data: dict, event: Optional[str] = None) -> str:
+    """Serialize an event as an SSE frame"""
+    lines = [f"id: {event_id}"]
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+class Subscription:
+    """
+    One connected client's view of the stream
+
+    Frames go into a bounded ring buffer. A client that falls behind loses
+    its oldest undelivered frames rather than slowing down publishers or
+    other clients; it is told how many it missed and can catch up via
+    Last-Event-ID while they're still in the replay ring.
+    """
+
+    def __init__(self, buffer_size: int = SSE_SUBSCRIBER_BUFFER):
+        self.buffer = deque(maxlen=max(1, buffer_size))
+        self.dropped = 0
+        self._ready = asyncio.Event()
+
+    def push(self, frame: str):
+        """Queue a frame, dropping the oldest one if the buffer is full"""
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(frame)
+        self._ready.set()
+
+    async def next_frames(self, timeout: float) -> List[str]:
+        """Wait up to `timeout` seconds for frames and take everything buffered"""
+        if not self.buffer:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+
+        frames = list(self.buffer)
+        self.buffer.clear()
+        self._ready.clear()
+
+        if self.dropped:
+            frames.insert(0, f": dropped {self.dropped} events\n\n")
+            self.dropped = 0
+
+        return frames
+
+class EventBroadcaster:
+    """
+    Fan-out of server-sent events to every connected client
+
+    Each published event gets the next monotonically increasing ID and is
+    serialized once; the same frame is then handed to every subscriber and
+    kept in a replay ring so reconnecting clients can resume after the last
+    ID they saw. With no subscribers, memory stays bounded by the ring.
+    """
+
+    def __init__(self, replay_size: int = SSE_REPLAY_SIZE, buffer_size: int = SSE_SUBSCRIBER_BUFFER):
+        self.buffer_size = buffer_size
+        self.last_event_id = 0
+        self._replay = deque(maxlen=max(1, replay_size))
+        self._subscribers: Set[Subscription] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def buffered_events(self) -> int:
+        """Frames queued across all subscribers but not yet sent"""
+        return sum(len(subscription.buffer) for subscription in self._subscribers)
+
+    def publish(self, data: dict, event: Optional[str] = None, event_id: Optional[int] = None) -> int:
+        """
+        Send an event to every subscriber and return its ID
+
+        Args:
+            data: JSON-serializable payload
+            event: SSE event name (None for the default "message")
+            event_id: ID to send instead of the next local one, so every
+                      worker numbers a shared event the same way; must be
+                      higher than any ID sent before
+        """
+        self.last_event_id = event_id if event_id is not None else self.last_event_id + 1
+        frame = format_sse(self.last_event_id, data, event)
+        self._replay.append((self.last_event_id, frame))
+
+        for subscription in self._subscribers:
+            subscription.push(frame)
+
+        return self.last_event_id
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Subscription:
+        """
+        Register a new client
+
+        Args:
+            last_event_id: ID of the last event the client received, if it is
+                           reconnecting; newer events still in the replay ring
+                           are queued for it straight away
+        """
+        subscription = Subscription(self.buffer_size)
+
+        # IDs above ours mean the client saw a previous server run; nothing to replay
+        if last_event_id is not None and last_event_id <= self.last_event_id:
+            for event_id, frame in self._replay:
+                if event_id > last_event_id:
+                    subscription.push(frame)
+
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a disconnected client"""
+        self._subscribers.discard(subscription)
+
+# Shared broadcaster for processed posts and other live events
+event_broadcaster = EventBroadcaster()
@@ -0,0 +1,342 @@
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from database import (
+    acquire_lease,
+    release_lease,
+    get_lease_holder,
+    append_events,
+    read_events,
+    get_last_event_id,
+    prune_events
+)
+from event_broadcaster import event_broadcaster
+
+# "memory" for a single worker process; "sqlite" shares events and leases
+# through the database so `uvicorn --workers N` behaves like one server
+EVENT_BUS = os.getenv("EVENT_BUS", "memory")
+
+# How often each worker reads new events from the shared log
+EVENT_BUS_POLL_MS = float(os.getenv("EVENT_BUS_POLL_MS", "100"))
+
+# Events published within this window are written to the log together
+EVENT_BUS_FLUSH_MS = float(os.getenv("EVENT_BUS_FLUSH_MS", "50"))
+
+# How long logged events are kept (only workers this far behind miss any)
+EVENT_LOG_RETENTION_SECONDS = float(os.getenv("EVENT_LOG_RETENTION_SECONDS", "300"))
+
+# Seconds a lease holder has to renew before another worker can take over
+LEASE_SECONDS = float(os.getenv("LEASE_SECONDS", "15"))
+
+# Events read from the log per query
+EVENT_LOG_BATCH = 1000
+
+# Topics: SSE events for clients ({"event": name or None, "data": payload}),
+# wake-ups for the background processor, and keyword CRUD for cached matchers
+SSE_TOPIC = "sse"
+POSTS_INGESTED_TOPIC = "posts_ingested"
+KEYWORDS_CHANGED_TOPIC = "keywords_changed"
+
+# Lease of the worker that runs the background jobs
+LEADER_LEASE = "leader"
+
+# handler(data, event_id, local): event_id is the shared log ID (None in
+# memory), local is whether this process published the event
+Handler = Callable[[Optional[dict], Optional[int], bool], None]
+
+async def run_together(*aws: Awaitable):
+    """
+    Run coroutines concurrently until they all finish or one fails
+
+    Unlike gather(), a failure or cancellation cancels the others and
+    waits for them to finish before returning, so nothing is left running.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.wait(tasks)
+
+class Lease:
+    """
+    A named lease held by this process, renewed in the background
+
+    `lost` is set if a renewal fails, after which another worker may take
+    the lease; work guarded by it should stop.
+    """
+
+    def __init__(self, bus: "InProcessEventBus", name: str):
+        self.bus = bus
+        self.name = name
+        self.lost = asyncio.Event()
+        self._renewed = time.monotonic()
+        self._renewal = asyncio.create_task(self._renew())
+
+    async def _renew(self):
+        while True:
+            await asyncio.sleep(LEASE_SECONDS / 3)
+            try:
+                held = await self.bus._acquire(self.name)
+                if held:
+                    self._renewed = time.monotonic()
+            except Exception as e:
+                print(f"Error renewing lease '{self.name}': {e}")
+                # Still ours until it would have expired
+                held = time.monotonic() - self._renewed < LEASE_SECONDS
+            if not held:
+                self.lost.set()
+                self.bus._held.discard(self.name)
+                return
+
+    async def release(self):
+        """Stop renewing and hand the lease back"""
+        self._renewal.cancel()
+        if not self.lost.is_set():
+            self.lost.set()
+            self.bus._held.discard(self.name)
+            await self.bus._release(self.name)
+
+class InProcessEventBus:
+    """
+    Event bus for a single worker process
+
+    Published events go straight to this process's handlers, and leases
+    are only tracked in memory. The base for the cross-process bus.
+    """
+
+    kind = "memory"
+
+    def __init__(self):
+        self.node_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._held: Set[str] = set()
+        self._leader_task: Optional[asyncio.Task] = None
+
+    def subscribe(self, topic: str, handler: Handler):
+        """Call `handler` for every event on `topic`, whichever worker published it"""
+        self._handlers.setdefault(topic, []).append(handler)
+
+    def publish(self, topic: str, data: Optional[dict] = None):
+        """Send an event to the handlers of every worker"""
+        self._deliver(topic, data, None, True)
+
+    def _deliver(self, topic: str, data: Optional[dict], event_id: Optional[int], local: bool):
+        for handler in self._handlers.get(topic, ()):
+            try:
+                handler(data, event_id, local)
+            except Exception as e:
+                print(f"Error handling '{topic}' event: {e}")
+
+    async def start(self):
+        """Start delivering events (call once the database is open)"""
+
+    async def close(self):
+        """Stop leading and hand back leases (call before closing the database)"""
+        if self._leader_task is not None:
+            self._leader_task.cancel()
+            try:
+                await self._leader_task
+            except asyncio.CancelledError:
+                pass
+
+    async def _acquire(self, name: str) -> bool:
+        return True
+
+    async def _release(self, name: str):
+        pass
+
+    async def try_lease(self, name: str) -> Optional[Lease]:
+        """Take a named lease if no worker (including this one) holds it"""
+        if name in self._held or not await self._acquire(name):
+            return None
+        self._held.add(name)
+        return Lease(self, name)
+
+    async def lease_holder(self, name: str) -> Optional[str]:
+        """Node ID of the worker holding a lease, or None"""
+        return self.node_id if name in self._held else None
+
+    def run_leader(self, work: Callable[[], Awaitable]):
+        """
+        Run `work` in whichever worker is elected leader
+
+        Every worker calls this; the one holding the leader lease runs
+        `work` and the rest wait to take over. If the leader stops
+        renewing (crashed, hung or lost the database), its lease expires
+        and another worker starts `work` within LEASE_SECONDS.
+        """
+        self._leader_task = asyncio.create_task(self._lead(work))
+
+    async def _lead(self, work: Callable[[], Awaitable]):
+        while True:
+            try:
+                lease = await self.try_lease(LEADER_LEASE)
+            except Exception as e:
+                print(f"Error acquiring the leader lease: {e}")
+                lease = None
+            if lease is None:
+                await asyncio.sleep(LEASE_SECONDS / 3)
+                continue
+
+            self.is_leader = True
+            print(f"Worker {self.node_id} is the leader")
+            task = asyncio.create_task(self._leader_work(work))
+            lost = asyncio.create_task(lease.lost.wait())
+            try:
+                await asyncio.wait({task, lost}, return_when=asyncio.FIRST_COMPLETED)
+                if task.done() and not task.cancelled() and task.exception():
+                    print(f"Leader work failed: {task.exception()}")
+            finally:
+                self.is_leader = False
+                task.cancel()
+                lost.cancel()
+                try:
+                    # Let the old work wind down before anyone (including us) starts
+                    # it again; wait() doesn't swallow our own cancellation
+                    await asyncio.wait({task})
+                finally:
+                    await lease.release()
+            # Don't spin if the work keeps exiting straight away
+            await asyncio.sleep(LEASE_SECONDS / 3)
+
+    async def _leader_work(self, work: Callable[[], Awaitable]):
+        await work()
+
+    def stats(self) -> Dict:
+        return {"kind": self.kind, "node_id": self.node_id, "is_leader": self.is_leader}
+
+class SQLiteEventBus(InProcessEventBus):
+    """
+    Event bus shared by worker processes through the SQLite database
+
+    Published events are appended to the event_log table in small
+    batches, and every worker (the publisher included) tails the log and
+    hands each event to its handlers, so events reach SSE clients on any
+    worker with the same IDs. Leases are rows in the leases table, so at
+    most one worker holds each. Costs one write per EVENT_BUS_FLUSH_MS
+    while events are flowing and one indexed read per EVENT_BUS_POLL_MS
+    per worker; events arrive up to about their sum later.
+    """
+
+    kind = "sqlite"
+
+    def __init__(self):
+        super().__init__()
+        self.last_event_id = 0
+        self._pending: List[Tuple[str, Optional[str], str]] = []
+        self._wake = asyncio.Event()
+        # One write to the log at a time, so a final flush can't race the loop's
+        self._flush_lock = asyncio.Lock()
+        self._tasks: List[asyncio.Task] = []
+
+    def publish(self, topic: str, data: Optional[dict] = None):
+        payload = json.dumps(data) if data is not None else None
+        event = (topic, payload, self.node_id)
+        # Payload-free events (wake-ups) only need to be sent once per batch
+        if payload is None and event in self._pending:
+            return
+        self._pending.append(event)
+        self._wake.set()
+
+    async def start(self):
+        # Only events from now on; earlier ones were for the previous run
+        self.last_event_id = await get_last_event_id()
+        self._tasks = [asyncio.create_task(self._flush_loop()), asyncio.create_task(self._tail_loop())]
+
+    async def close(self):
+        await super().close()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._flush()
+
+    async def _flush(self):
+        async with self._flush_lock:
+            events, self._pending = self._pending, []
+            try:
+                await append_events(events)
+            except Exception as e:
+                print(f"Error writing {len(events)} events to the log: {e}")
+                self._pending[:0] = events
+                raise
+
+    async def _flush_loop(self):
+        while True:
+            await self._wake.wait()
+            await asyncio.sleep(EVENT_BUS_FLUSH_MS / 1000)
+            self._wake.clear()
+            try:
+                # Shielded: cancelling the loop mustn't abandon a write half done
+                await asyncio.shield(self._flush())
+            except Exception:
+                self._wake.set()
+                await asyncio.sleep(1)
+
+    async def _tail_loop(self):
+        while True:
+            try:
+                events = await read_events(self.last_event_id, EVENT_LOG_BATCH)
+            except Exception as e:
+                print(f"Error reading the event log: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            for event in events:
+                self.last_event_id = event['id']
+                data = json.loads(event['data']) if event['data'] is not None else None
+                self._deliver(event['topic'], data, event['id'], event['origin'] == self.node_id)
+            if len(events) < EVENT_LOG_BATCH:
+                await asyncio.sleep(EVENT_BUS_POLL_MS / 1000)
+
+    async def _prune_loop(self):
+        while True:
+            try:
+                await prune_events(time.time() - EVENT_LOG_RETENTION_SECONDS)
+            except Exception as e:
+                print(f"Error pruning the event log: {e}")
+            await asyncio.sleep(min(60.0, EVENT_LOG_RETENTION_SECONDS))
+
+    async def _leader_work(self, work: Callable[[], Awaitable]):
+        # The leader also keeps the shared log short
+        await run_together(work(), self._prune_loop())
+
+    async def _acquire(self, name: str) -> bool:
+        return await acquire_lease(name, self.node_id, LEASE_SECONDS)
+
+    async def _release(self, name: str):
+        await release_lease(name, self.node_id)
+
+    async def lease_holder(self, name: str) -> Optional[str]:
+        return await get_lease_holder(name)
+
+    def stats(self) -> Dict:
+        return {**super().stats(), "last_event_id": self.last_event_id, "pending": len(self._pending)}
+
+def create_event_bus(kind: str = EVENT_BUS) -> InProcessEventBus:
+    if kind == "memory":
+        return InProcessEventBus()
+    if kind == "sqlite":
+        return SQLiteEventBus()
+    raise ValueError(f"Unknown EVENT_BUS '{kind}' (choose from: memory, sqlite)")
+
+def broadcast(data: dict, event: Optional[str] = None):
+    """Send an SSE event to the clients of every worker"""
+    event_bus.publish(SSE_TOPIC, {"event": event, "data": data})
+
+def _send_to_clients(message: dict, event_id: Optional[int], local: bool):
+    event_broadcaster.publish(message["data"], message["event"], event_id)
+
+# Shared bus for this process
+event_bus = create_event_bus()
+event_bus.subscribe(SSE_TOPIC, _send_to_clients)
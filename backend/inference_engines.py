@@ -0,0 +1,294 @@
+import os
+import threading
+from typing import Any, Dict, List, Tuple
+
+# Which engine runs the model: "pipeline", "quantized" or "onnx"
+SENTIMENT_ENGINE = os.getenv("SENTIMENT_ENGINE", "pipeline")
+
+# Exported ONNX model for the onnx engine (exported on first load if missing)
+SENTIMENT_ONNX_PATH = os.getenv(
+    "SENTIMENT_ONNX_PATH",
+    os.path.join(os.path.dirname(__file__), "models", "sentiment.onnx")
+)
+
+# Longest input the model sees, in tokens (the tokenizer truncates to this;
+# capped at the model's own limit when it loads)
+SENTIMENT_MAX_TOKENS = int(os.getenv("SENTIMENT_MAX_TOKENS", "512"))
+
+# Texts per forward pass after sorting a batch by length
+INFERENCE_BUCKET_SIZE = int(os.getenv("INFERENCE_BUCKET_SIZE", "16"))
+
+# Character cap applied before tokenizing, only to bound tokenizer work on
+# pathological inputs; far more than SENTIMENT_MAX_TOKENS tokens ever need
+MAX_INPUT_CHARS = SENTIMENT_MAX_TOKENS * 16
+
+def clip_text(text: str) -> str:
+    """Cut absurdly long texts before they reach the tokenizer"""
+    return text[:MAX_INPUT_CHARS] if len(text) > MAX_INPUT_CHARS else text
+
+class SentimentEngine:
+    """
+    Base class for the ways we can run the sentiment model
+
+    Every engine takes the same preprocessed input and returns the same raw
+    output: one {"label": str, "score": float} dict per text, where score is
+    the probability of the predicted label. Neutral thresholding and label
+    mapping happen afterwards in sentiment_analyzer, identically for all
+    engines.
+
+    Inputs are truncated by the tokenizer to max_tokens, which is capped at
+    the model's own limit on load. Before the forward passes a batch is
+    sorted by length and split into buckets of bucket_size, so short posts
+    are padded only to the length of their neighbours instead of the
+    longest post in the batch; results are put back in the caller's order.
+    Each text is tokenized once: engines that tokenize themselves sort by
+    token count and pad each bucket from that encoding, while the pipeline
+    (which tokenizes internally) gets raw texts sorted by character count.
+    """
+
+    name = "base"
+
+    def __init__(
+        self,
+        model_name: str,
+        max_tokens: int = SENTIMENT_MAX_TOKENS,
+        bucket_size: int = INFERENCE_BUCKET_SIZE
+    ):
+        self.model_name = model_name
+        self.max_tokens = max_tokens
+        self.bucket_size = max(1, bucket_size)
+        self.loaded = False
+        self._tokenizer = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def model_id(self) -> str:
+        """Identifies both the weights and how they're run (e.g. for caching)"""
+        return f"{self.model_name}:{self.name}:{self.max_tokens}"
+
+    def load(self):
+        """Load the model (no-op if already loaded)"""
+        if self.loaded:
+            return
+        # Warm-up and the first real batch can race here from executor threads
+        with self._load_lock:
+            if not self.loaded:
+                print(f"Loading sentiment model {self.model_name} ({self.name} engine)...")
+                self._load()
+                # Longer inputs would overflow the model's position embeddings
+                limit = getattr(self._tokenizer, "model_max_length", None)
+                if limit and self.max_tokens > limit:
+                    print(f"SENTIMENT_MAX_TOKENS={self.max_tokens} is above the model's limit; using {limit}")
+                    self.max_tokens = limit
+                self.loaded = True
+                print("Model loaded successfully!")
+
+    def predict(self, texts: List[str]) -> List[Dict]:
+        """Classify a batch of texts (blocking)"""
+        if not texts:
+            return []
+        self.load()
+        texts = [clip_text(text) for text in texts]
+
+        inputs, lengths = self._prepare(texts)
+        order = sorted(range(len(texts)), key=lengths.__getitem__)
+
+        results = [None] * len(texts)
+        for start in range(0, len(order), self.bucket_size):
+            bucket = order[start:start + self.bucket_size]
+            for index, result in zip(bucket, self._predict([inputs[i] for i in bucket])):
+                results[index] = result
+        return results
+
+    def _prepare(self, texts: List[str]) -> Tuple[List[Any], List[int]]:
+        """
+        Model inputs for each text and the lengths to bucket them by
+
+        By default the raw texts, by character count (a close proxy for
+        token count that doesn't tokenize them twice).
+        """
+        return texts, [len(text) for text in texts]
+
+    def _load(self):
+        raise NotImplementedError
+
+    def _predict(self, inputs: List[Any]) -> List[Dict]:
+        """Classify one bucket of inputs from _prepare"""
+        raise NotImplementedError
+
+class PipelineEngine(SentimentEngine):
+    """The stock fp32 Hugging Face pipeline (the baseline engine)"""
+
+    name = "pipeline"
+
+    def _load(self):
+        from transformers import pipeline
+
+        # Using DistilBERT fine-tuned on SST-2 (sentiment analysis)
+        # This is a lightweight, fast model perfect for real-time analysis
+        self._pipeline = pipeline(
+            "sentiment-analysis",
+            model=self.model_name,
+            device=-1  # Use CPU (-1), change to 0 for GPU
+        )
+        self._tokenizer = self._pipeline.tokenizer
+
+    def _predict(self, texts: List[str]) -> List[Dict]:
+        # Without batch_size the pipeline would still run one forward pass per text
+        return self._pipeline(
+            texts,
+            batch_size=len(texts),
+            truncation=True,
+            max_length=self.max_tokens
+        )
+
+class _LogitsEngine(SentimentEngine):
+    """Engines that tokenize themselves and turn raw logits into labels"""
+
+    def _load_tokenizer(self):
+        from transformers import AutoConfig, AutoTokenizer
+
+        self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self._id2label = AutoConfig.from_pretrained(self.model_name).id2label
+
+    def _tokenize(self, texts: List[str], return_tensors: str):
+        return self._tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_tokens,
+            return_tensors=return_tensors
+        )
+
+    def _prepare(self, texts: List[str]) -> Tuple[List[Any], List[int]]:
+        # Tokenized once, unpadded; each bucket is padded by _pad
+        encoded = self._tokenizer(texts, truncation=True, max_length=self.max_tokens)
+        features = [
+            {"input_ids": input_ids, "attention_mask": attention_mask}
+            for input_ids, attention_mask in zip(encoded["input_ids"], encoded["attention_mask"])
+        ]
+        return features, [len(feature["input_ids"]) for feature in features]
+
+    def _pad(self, features: List[Dict], return_tensors: str):
+        """Pad one bucket of _prepare features to its longest member"""
+        return self._tokenizer.pad(features, padding=True, return_tensors=return_tensors)
+
+    def _logits_to_results(self, logits) -> List[Dict]:
+        """Softmax over each row of a numpy logits array, as the pipeline does"""
+        import numpy as np
+
+        shifted = logits - logits.max(axis=-1, keepdims=True)
+        probs = np.exp(shifted)
+        probs /= probs.sum(axis=-1, keepdims=True)
+        best = probs.argmax(axis=-1)
+
+        return [
+            {"label": self._id2label[int(index)], "score": float(row[index])}
+            for row, index in zip(probs, best)
+        ]
+
+class QuantizedTorchEngine(_LogitsEngine):
+    """The same model with its Linear layers dynamically quantized to int8"""
+
+    name = "quantized"
+
+    def _load(self):
+        import torch
+        from transformers import AutoModelForSequenceClassification
+
+        self._load_tokenizer()
+        model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+        model.eval()
+        self._model = torch.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+    def _predict(self, features: List[Dict]) -> List[Dict]:
+        import torch
+
+        encoded = self._pad(features, return_tensors="pt")
+        with torch.inference_mode():
+            logits = self._model(**encoded).logits
+        return self._logits_to_results(logits.numpy())
+
+class OnnxEngine(_LogitsEngine):
+    """The model exported to ONNX and run by ONNX Runtime"""
+
+    name = "onnx"
+
+    def __init__(self, model_name: str, onnx_path: str = SENTIMENT_ONNX_PATH, **kwargs):
+        super().__init__(model_name, **kwargs)
+        self.onnx_path = onnx_path
+
+    def _export(self):
+        """Export the Hugging Face model to ONNX with dynamic batch and sequence axes"""
+        import torch
+        from transformers import AutoModelForSequenceClassification
+
+        print(f"Exporting {self.model_name} to {self.onnx_path}...")
+        os.makedirs(os.path.dirname(self.onnx_path) or ".", exist_ok=True)
+
+        model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+        model.eval()
+        sample = self._tokenize(["export sample"], return_tensors="pt")
+        dynamic_axes = {"input_ids": {0: "batch", 1: "sequence"},
+                        "attention_mask": {0: "batch", 1: "sequence"},
+                        "logits": {0: "batch"}}
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            self.onnx_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+
+    def _load(self):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError(
+                "The onnx sentiment engine needs onnxruntime (pip install onnxruntime)"
+            ) from e
+
+        self._load_tokenizer()
+        if not os.path.exists(self.onnx_path):
+            self._export()
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = int(os.getenv("OMP_NUM_THREADS", "0"))
+        if threads:
+            options.intra_op_num_threads = threads
+
+        self._session = onnxruntime.InferenceSession(
+            self.onnx_path, options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self._session.get_inputs()}
+
+    def _predict(self, features: List[Dict]) -> List[Dict]:
+        encoded = self._pad(features, return_tensors="np")
+        feed = {
+            name: value.astype("int64")
+            for name, value in encoded.items()
+            if name in self._input_names
+        }
+        logits = self._session.run(["logits"], feed)[0]
+        return self._logits_to_results(logits)
+
+ENGINES = {
+    PipelineEngine.name: PipelineEngine,
+    QuantizedTorchEngine.name: QuantizedTorchEngine,
+    OnnxEngine.name: OnnxEngine,
+}
+
+def create_engine(name: str, model_name: str) -> SentimentEngine:
+    """Build the engine registered under `name` (not loaded yet)"""
+    try:
+        engine_class = ENGINES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown sentiment engine '{name}' (choose from: {', '.join(ENGINES)})"
+        )
+    return engine_class(model_name)
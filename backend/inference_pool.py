@@ -0,0 +1,176 @@
+import asyncio
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Set
+
+# Model replicas (0 = one per INFERENCE_THREADS_PER_WORKER cores) and their thread budget
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+INFERENCE_THREADS_PER_WORKER = int(os.getenv("INFERENCE_THREADS_PER_WORKER", "2"))
+
+# How often (seconds) the pool is pinged, and how long a ping may take
+INFERENCE_HEALTH_INTERVAL = float(os.getenv("INFERENCE_HEALTH_INTERVAL", "30"))
+INFERENCE_HEALTH_TIMEOUT = float(os.getenv("INFERENCE_HEALTH_TIMEOUT", "60"))
+
+def _init_worker(threads: int, started):
+    """Runs once in each worker process: pin thread counts, then load a model replica"""
+    # Lets the parent find (and kill) this worker if it hangs
+    started.put(os.getpid())
+
+    # Must be set before torch is imported to size its OpenMP pool
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+    import torch
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+    from sentiment_analyzer import get_sentiment_engine
+    get_sentiment_engine().load()
+
+def _classify_in_worker(texts: List[str]) -> List[Dict]:
+    from sentiment_analyzer import classify_texts
+    return classify_texts(texts)
+
+def _ping() -> int:
+    return os.getpid()
+
+class InferencePool:
+    """
+    Model replicas in a pool of worker processes
+
+    Each worker loads its own copy of the model and runs with a fixed number
+    of intra-op threads, so N workers keep N x threads cores busy without the
+    GIL or torch's thread pool competing with the event loop. A crashed
+    worker breaks the executor; the pool then restarts it and retries the
+    batch once. A periodic ping restarts the pool if it stops answering.
+    """
+
+    def __init__(
+        self,
+        workers: int = INFERENCE_WORKERS,
+        threads_per_worker: int = INFERENCE_THREADS_PER_WORKER
+    ):
+        self.threads_per_worker = max(1, threads_per_worker)
+        self.workers = workers or max(1, (os.cpu_count() or 1) // self.threads_per_worker)
+        self.restarts = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Workers of the current executor report their PIDs here
+        self._started = None
+        self._worker_pids: Set[int] = set()
+        self._monitor: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Spawn the worker processes (no-op if already running)"""
+        if self._executor is not None:
+            return
+        print(f"Starting inference pool: {self.workers} workers x {self.threads_per_worker} threads")
+        # spawn, not fork: forking a process that already imported torch is unsafe
+        context = multiprocessing.get_context("spawn")
+        self._started = context.SimpleQueue()
+        self._worker_pids = set()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.threads_per_worker, self._started)
+        )
+
+    def restart(self, failed: Optional[ProcessPoolExecutor] = None):
+        """
+        Tear down the workers (killing hung ones) and spawn fresh ones
+
+        Args:
+            failed: The executor that was seen failing; if it has already been
+                    replaced by a concurrent restart, nothing is done
+        """
+        if failed is not None and failed is not self._executor:
+            return
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            # Hung workers never finish on their own, so terminate them outright.
+            # Only live children of ours are touched, so a reused PID is safe.
+            pids = self._reported_pids()
+            for process in multiprocessing.active_children():
+                if process.pid in pids:
+                    process.terminate()
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.restarts += 1
+        self.start()
+
+    def _reported_pids(self) -> Set[int]:
+        """PIDs of every worker the current executor has started"""
+        while self._started is not None and not self._started.empty():
+            self._worker_pids.add(self._started.get())
+        return self._worker_pids
+
+    async def _run_chunk(self, texts: List[str]) -> List[Dict]:
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            self.start()
+            executor = self._executor
+            try:
+                return await loop.run_in_executor(executor, _classify_in_worker, texts)
+            except BrokenProcessPool:
+                if attempt:
+                    raise
+                print("Inference worker crashed, restarting pool...")
+                self.restart(executor)
+
+    async def classify(self, texts: List[str]) -> List[Dict]:
+        """Classify texts, spreading large batches across the replicas"""
+        if not texts:
+            return []
+        chunk_size = math.ceil(len(texts) / self.workers)
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        results = await asyncio.gather(*[self._run_chunk(chunk) for chunk in chunks])
+        return [result for chunk_results in results for result in chunk_results]
+
+    async def health_check(self) -> bool:
+        """Ping a worker; restart the pool if it is broken or unresponsive"""
+        loop = asyncio.get_running_loop()
+        self.start()
+        executor = self._executor
+        try:
+            await asyncio.wait_for(
+                loop.run_in_executor(executor, _ping),
+                timeout=INFERENCE_HEALTH_TIMEOUT
+            )
+            return True
+        except (BrokenProcessPool, asyncio.TimeoutError) as e:
+            print(f"Inference pool unhealthy ({type(e).__name__}), restarting...")
+            self.restart(executor)
+            return False
+
+    async def _monitor_loop(self):
+        while True:
+            await asyncio.sleep(INFERENCE_HEALTH_INTERVAL)
+            try:
+                await self.health_check()
+            except Exception as e:
+                print(f"Error checking inference pool health: {e}")
+
+    def start_monitor(self):
+        """Start periodic health checks on the running loop"""
+        if self._monitor is None or self._monitor.done():
+            self._monitor = asyncio.get_running_loop().create_task(self._monitor_loop())
+
+    def shutdown(self):
+        """Stop health checks and the worker processes"""
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "threads_per_worker": self.threads_per_worker,
+            "running": self._executor is not None,
+            "restarts": self.restarts
+        }
@@ -0,0 +1,154 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+class MicroBatchScheduler:
+    """
+    Collect concurrent single-item requests into batches
+
+    Callers await submit(item) and get back their own result. A background
+    collector drains the queue into batches of up to max_batch_size items,
+    waiting at most max_wait_ms after the first item arrives, then runs the
+    whole batch through batch_fn and resolves each caller's future.
+
+    Args:
+        batch_fn: Async callable taking a list of items and returning a list
+                  of results in the same order
+        max_batch_size: Upper bound on items per batch
+        max_wait_ms: Longest time the first item in a batch waits for company
+        max_concurrency: Batches allowed in flight at once (e.g. one per
+                         model replica); while all slots are busy, new
+                         items keep queueing and form the next batch
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 10.0,
+        max_concurrency: int = 1
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_concurrency = max(1, max_concurrency)
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight = set()
+
+    def _ensure_started(self):
+        """Start the collector on the running loop (restarting it if the loop changed)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._collector is None or self._collector.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._collector = loop.create_task(self._collect())
+
+    async def submit(self, item: Any) -> Any:
+        """Queue a single item and wait for its result"""
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    def queue_size(self) -> int:
+        """Number of items waiting to be batched"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def close(self):
+        """Stop the collector and fail anything still queued"""
+        if self._collector is not None:
+            self._collector.cancel()
+            try:
+                await self._collector
+            except asyncio.CancelledError:
+                pass
+            self._collector = None
+
+        in_flight = list(self._in_flight)
+        for task in in_flight:
+            task.cancel()
+        # Each cancelled batch fails its own callers
+        await asyncio.gather(*in_flight, return_exceptions=True)
+
+        if self._queue is not None:
+            queued = []
+            while not self._queue.empty():
+                queued.append(self._queue.get_nowait())
+            self._fail(queued)
+
+    def _fail(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """Fail the callers of items that will never run"""
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(RuntimeError("Inference scheduler closed"))
+
+    async def _collect(self):
+        """Background loop: gather a batch, run it, repeat"""
+        loop = asyncio.get_running_loop()
+        while True:
+            # Hold a slot first so items keep piling into this batch while
+            # every slot is busy
+            await self._slots.acquire()
+            batch = []
+            task = None
+            try:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self.max_wait
+
+                while len(batch) < self.max_batch_size:
+                    # Take whatever is already queued without waiting
+                    if not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                        continue
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+
+                task = loop.create_task(self._run_batch(batch))
+                self._in_flight.add(task)
+                task.add_done_callback(lambda done, batch=batch: self._batch_done(done, batch))
+            finally:
+                if task is None:
+                    # Cancelled mid-batch: these items are off the queue but won't run
+                    self._slots.release()
+                    self._fail(batch)
+
+    def _batch_done(self, task: asyncio.Task, batch: List[Tuple[Any, asyncio.Future]]):
+        self._in_flight.discard(task)
+        if task.cancelled():
+            # Covers batches cancelled before they started running
+            self._fail(batch)
+        self._slots.release()
+
+    async def _run_batch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """Run one batch and hand each result back to its caller"""
+        # Callers that gave up (cancelled) don't need a slot in the batch
+        batch = [(item, future) for item, future in batch if not future.done()]
+        if not batch:
+            return
+
+        try:
+            results = await self.batch_fn([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(
+                    f"Batch function returned {len(results)} results for {len(batch)} items"
+                )
+        except asyncio.CancelledError:
+            self._fail(batch)
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,233 @@
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from database import (
+    add_post_keyword,
+    count_pending_posts,
+    find_posts_matching,
+    get_last_post_id,
+    claim_ignored_posts
+)
+from event_bus import broadcast
+from keyword_matcher import KeywordMatcher
+from metrics import KEYWORD_BACKFILL_POSTS
+from post_processor import PROCESS_BATCH_SIZE, PROCESSOR_LEASE_SECONDS, process_claimed_posts
+from response_cache import dashboard_cache
+
+# Start a backfill of earlier ignored posts whenever a keyword is added
+KEYWORD_BACKFILL = os.getenv("KEYWORD_BACKFILL", "1") != "0"
+
+# Posts claimed, classified and written together by a backfill
+KEYWORD_BACKFILL_BATCH_SIZE = int(os.getenv("KEYWORD_BACKFILL_BATCH_SIZE", str(PROCESS_BATCH_SIZE)))
+
+# Max posts per second a backfill reclassifies (0 for no limit)
+KEYWORD_BACKFILL_RATE = float(os.getenv("KEYWORD_BACKFILL_RATE", "200"))
+
+# Backfills pause while this many live posts are waiting to be processed
+KEYWORD_BACKFILL_MAX_PENDING = int(os.getenv("KEYWORD_BACKFILL_MAX_PENDING", str(PROCESS_BATCH_SIZE)))
+
+# How often a paused backfill re-checks the live backlog
+KEYWORD_BACKFILL_POLL_SECONDS = float(os.getenv("KEYWORD_BACKFILL_POLL_SECONDS", "1"))
+
+# Finished jobs kept for the progress endpoint
+KEYWORD_BACKFILL_HISTORY = 50
+
+_WORD = re.compile(r"\w+")
+
+def keyword_match_query(keyword: str) -> Optional[str]:
+    """
+    FTS5 query for posts that may contain a keyword
+
+    The keyword's words as a phrase, with the last one as a prefix, so
+    "tesla" also finds "Teslas" and "#TeslaMotors". The index is
+    word-based, so occurrences that start mid-word ("mytesla") aren't
+    found. Returns None for keywords without any word characters.
+    """
+    words = _WORD.findall(keyword.lower())
+    if not words:
+        return None
+    return '"' + " ".join(words) + '" *'
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+class BackfillJob:
+    """Progress of one keyword's backfill"""
+
+    def __init__(self, job_id: int, keyword_id: int, keyword: str):
+        self.id = job_id
+        self.keyword_id = keyword_id
+        self.keyword = keyword
+        self.status = "queued"
+        self.until_id = 0
+        self.last_post_id = 0
+        self.candidates = 0
+        self.processed = 0
+        self.linked = 0
+        self.ignored = 0
+        self.errors = 0
+        self.paused_seconds = 0.0
+        self.error: Optional[str] = None
+        self.created_at = _now()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "keyword_id": self.keyword_id,
+            "keyword": self.keyword,
+            "status": self.status,
+            # Share of the id range scanned so far
+            "progress": round(min(1.0, self.last_post_id / self.until_id), 4) if self.until_id else (
+                1.0 if self.status == "done" else 0.0
+            ),
+            "candidates": self.candidates,
+            "processed": self.processed,
+            "linked": self.linked,
+            "ignored": self.ignored,
+            "errors": self.errors,
+            "paused_seconds": round(self.paused_seconds, 1),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+class KeywordBackfill:
+    """
+    Gives a newly added keyword the history of the posts before it
+
+    Posts are only matched against the keywords tracked when they're
+    processed, so a new keyword starts with no history. A backfill finds
+    the posts that contain the keyword through the full-text index and
+    confirms each with the same substring matching as live processing.
+    Ignored posts go back through the batch processing path, which
+    classifies them and updates the rollups; posts already processed
+    under other keywords keep their sentiment and are just counted
+    under this keyword too.
+
+    Jobs run one at a time. Each batch waits while the live backlog is
+    at or above KEYWORD_BACKFILL_MAX_PENDING and is paced to at most
+    KEYWORD_BACKFILL_RATE posts per second, so live posts keep the model
+    and the writer to themselves when they need them.
+    """
+
+    def __init__(self):
+        self._jobs: "OrderedDict[int, BackfillJob]" = OrderedDict()
+        self._next_id = 1
+        self._lock = asyncio.Lock()
+
+    def start(self, keyword_id: int, keyword: str) -> BackfillJob:
+        """Queue a backfill for a keyword and return its job"""
+        job = BackfillJob(self._next_id, keyword_id, keyword)
+        self._next_id += 1
+        self._jobs[job.id] = job
+        self._trim()
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    def cancel(self, keyword_id: int):
+        """Stop any queued or running backfill for a keyword (e.g. when it's deleted)"""
+        for job in self._jobs.values():
+            if job.keyword_id == keyword_id and job.task is not None and not job.task.done():
+                job.task.cancel()
+
+    def get(self, job_id: int) -> Optional[BackfillJob]:
+        return self._jobs.get(job_id)
+
+    def jobs(self, keyword_id: Optional[int] = None) -> List[Dict]:
+        """Newest jobs first, optionally only for one keyword"""
+        return [
+            job.to_dict() for job in reversed(self._jobs.values())
+            if keyword_id is None or job.keyword_id == keyword_id
+        ]
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - KEYWORD_BACKFILL_HISTORY)]:
+            del self._jobs[job_id]
+
+    def _publish(self, job: BackfillJob):
+        broadcast(job.to_dict(), event="backfill")
+
+    async def _run(self, job: BackfillJob):
+        try:
+            async with self._lock:
+                job.status = "running"
+                job.started_at = _now()
+                await self._backfill(job)
+                job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            print(f"Error backfilling keyword '{job.keyword}': {e}")
+        finally:
+            job.finished_at = _now()
+            self._publish(job)
+            self._trim()
+
+    async def _wait_for_live_work(self, job: BackfillJob):
+        """Block while live posts are waiting, so they're processed first"""
+        started = time.perf_counter()
+        while await count_pending_posts() >= KEYWORD_BACKFILL_MAX_PENDING:
+            await asyncio.sleep(KEYWORD_BACKFILL_POLL_SECONDS)
+        job.paused_seconds += time.perf_counter() - started
+
+    async def _backfill(self, job: BackfillJob):
+        query = keyword_match_query(job.keyword)
+        if query is None:
+            return
+        matcher = KeywordMatcher([job.keyword])
+        # Later posts are processed with the new keyword already in place
+        job.until_id = await get_last_post_id()
+
+        while True:
+            await self._wait_for_live_work(job)
+            batch_started = time.monotonic()
+
+            candidates = await find_posts_matching(
+                query, job.last_post_id, job.until_id, KEYWORD_BACKFILL_BATCH_SIZE
+            )
+            if not candidates:
+                job.last_post_id = job.until_id
+                return
+            job.last_post_id = candidates[-1]['id']
+            job.candidates += len(candidates)
+
+            # The index also finds accent and prefix variants; keep real substring matches
+            matches = [post for post in candidates if matcher.match_first(post['text'])]
+            linked = await add_post_keyword(job.keyword, [
+                post['id'] for post in matches if post['processing_status'] == 'processed'
+            ])
+            posts = await claim_ignored_posts([
+                post['id'] for post in matches if post['processing_status'] == 'ignored'
+            ], PROCESSOR_LEASE_SECONDS)
+            results = await process_claimed_posts(posts, observe_latency=False)
+
+            processed = sum(1 for r in results if r['status'] == 'processed')
+            job.processed += processed
+            job.linked += linked
+            job.ignored += sum(1 for r in results if r['status'] == 'ignored')
+            job.errors += sum(1 for r in results if r['status'] == 'error')
+            KEYWORD_BACKFILL_POSTS.inc(processed)
+            if processed or linked:
+                # Not broadcast as live posts or fed to spike detection: they're history
+                dashboard_cache.data_changed()
+            self._publish(job)
+
+            if KEYWORD_BACKFILL_RATE > 0:
+                delay = len(posts) / KEYWORD_BACKFILL_RATE - (time.monotonic() - batch_started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+# Shared runner for the keyword endpoints
+keyword_backfill = KeywordBackfill()
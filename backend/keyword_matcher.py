@@ -0,0 +1,92 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a fixed set of keywords
+
+    Built once per keyword set, then every lookup is a single pass over the
+    lowercased text, so matching cost depends on the text length and not on
+    how many keywords are tracked. Matching is case-insensitive substring
+    matching, the same semantics as the original per-keyword scan.
+
+    Keywords keep their given order as priority: match_first() returns the
+    earliest keyword in that order that occurs anywhere in the text.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = []
+        # Trie as parallel lists indexed by node id
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        seen = set()
+        for keyword in keywords:
+            pattern = keyword.lower()
+            if not pattern or pattern in seen:
+                continue
+            seen.add(pattern)
+            self.keywords.append(keyword)
+            self._add_pattern(pattern, len(self.keywords) - 1)
+
+        self._build_failure_links()
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def _add_pattern(self, pattern: str, keyword_index: int):
+        """Insert a pattern into the trie"""
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[node][char] = next_node
+            node = next_node
+        self._output[node].append(keyword_index)
+
+    def _build_failure_links(self):
+        """Breadth-first pass that wires failure links and merges outputs"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def _scan(self, text: str) -> set:
+        """Return indices of all keywords found in text"""
+        found = set()
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        node = 0
+        for char in text.lower():
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found.update(output[node])
+        return found
+
+    def match_all(self, text: str) -> List[str]:
+        """All keywords occurring in text, in priority order"""
+        if not self.keywords:
+            return []
+        return [self.keywords[index] for index in sorted(self._scan(text))]
+
+    def match_first(self, text: str) -> Optional[str]:
+        """Highest-priority keyword occurring in text, or None"""
+        if not self.keywords:
+            return None
+        found = self._scan(text)
+        return self.keywords[min(found)] if found else None
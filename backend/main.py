@@ -1,27 +1,57 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse, Response
+from starlette.requests import ClientDisconnect
 from pydantic import BaseModel
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, timedelta
 import asyncio
+import base64
+import binascii
 import json
 import random
 
 from database import (
+    open_pool,
+    close_pool,
     init_db,
     add_keyword,
     get_keywords,
     delete_keyword,
     create_post,
+    create_posts_bulk,
+    count_pending_posts,
+    search_posts,
     get_recent_posts,
     get_dashboard_stats,
-    get_hourly_trends
+    get_keyword_stats,
+    get_hourly_trends,
+    get_sentiment_trends,
+    bump_keywords_version,
+    get_post_partitions
 )
+from sentiment_analyzer import (
+    sentiment_cache,
+    inference_pool,
+    inference_scheduler,
+    model_status,
+    is_model_ready,
+    warm_up_model,
+    MODEL_WARMUP
+)
+from event_broadcaster import event_broadcaster
+from event_bus import SSE_TOPIC, KEYWORDS_CHANGED_TOPIC, event_bus, run_together
+from stream_ingest import ingest_ndjson
+from response_cache import dashboard_cache, etag_matches
+from near_duplicates import near_duplicate_index
+from spike_detector import spike_detector
+from post_archive import archive_maintenance_background
+from keyword_backfill import KEYWORD_BACKFILL, keyword_backfill
+from metrics import REGISTRY, PENDING_POSTS, SSE_SUBSCRIBERS, QUEUE_SIZE
 from post_processor import (
     process_post_and_notify,
     process_pending_posts_background,
-    processed_posts_queue
+    notify_new_posts
 )
 
 # Initialize FastAPI app
@@ -52,36 +82,99 @@ class PostsSimulate(BaseModel):
 # Global flag to track if background processor is running
 background_processor_started = False
 
+def _on_keywords_changed(data: dict, event_id: Optional[int], local: bool):
+    """Drop responses built from the old keywords, and pick up changes made through another worker"""
+    dashboard_cache.invalidate()
+    if local:
+        # The database layer already bumped our matcher version
+        return
+    bump_keywords_version()
+    if data.get("deleted"):
+        keyword_backfill.cancel(data["keyword_id"])
+
+def _on_sse_event(message: dict, event_id: Optional[int], local: bool):
+    """Keep this worker's caches and alert history in step with the others"""
+    if local:
+        return
+    if message["event"] in (None, "backfill"):
+        # Posts processed (or backfilled) by another worker
+        dashboard_cache.data_changed()
+    elif message["event"] == "alert":
+        spike_detector.remember(message["data"])
+
+event_bus.subscribe(KEYWORDS_CHANGED_TOPIC, _on_keywords_changed)
+event_bus.subscribe(SSE_TOPIC, _on_sse_event)
+
+async def run_background_jobs():
+    """Jobs that run in only one worker: pending post processing and archive maintenance"""
+    await run_together(process_pending_posts_background(), archive_maintenance_background())
+
+# Gauges read at scrape time
+SSE_SUBSCRIBERS.set_function(lambda: event_broadcaster.subscriber_count)
+QUEUE_SIZE.labels(queue="inference").set_function(inference_scheduler.queue_size)
+QUEUE_SIZE.labels(queue="sse_buffered").set_function(lambda: event_broadcaster.buffered_events)
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize database and start background processor on startup"""
     global background_processor_started
 
+    if inference_pool is not None:
+        # Spawn the model replicas now rather than on the first post
+        inference_pool.start()
+        inference_pool.start_monitor()
+
+    if MODEL_WARMUP:
+        # Load the model in the background; /health/ready reports when it's done
+        asyncio.create_task(warm_up_model())
+
     print("Initializing database...")
+    await open_pool()
     await init_db()
     print("Database initialized!")
+    await event_bus.start()
 
-    # Start background post processor
+    # Start background post processor (and archive maintenance) in the elected worker
     if not background_processor_started:
-        asyncio.create_task(process_pending_posts_background())
+        event_bus.run_leader(run_background_jobs)
         background_processor_started = True
         print("Background post processor started!")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close pooled database connections, caches and inference workers on shutdown"""
+    if inference_pool is not None:
+        inference_pool.shutdown()
+    await sentiment_cache.close()
+    # Hands the leader lease to another worker and flushes unsent events
+    await event_bus.close()
+    await close_pool()
+
 # ============== KEYWORD MANAGEMENT ENDPOINTS ==============
 
 @app.post("/api/keywords", status_code=201)
-async def create_keyword(keyword_data: KeywordCreate):
-    """Add a new keyword to track"""
+async def create_keyword(keyword_data: KeywordCreate, backfill: bool = KEYWORD_BACKFILL):
+    """
+    Add a new keyword to track
+
+    With `backfill` (on by default), earlier posts that were ignored but
+    contain the keyword are classified in the background, so the keyword
+    shows history straight away.
+    """
     try:
         keyword_id = await add_keyword(keyword_data.keyword)
-        return {
-            "status": "success",
-            "keyword_id": keyword_id,
-            "keyword": keyword_data.keyword
-        }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    event_bus.publish(KEYWORDS_CHANGED_TOPIC, {"keyword_id": keyword_id, "deleted": False})
+    job = keyword_backfill.start(keyword_id, keyword_data.keyword.lower()) if backfill else None
+    return {
+        "status": "success",
+        "keyword_id": keyword_id,
+        "keyword": keyword_data.keyword,
+        "backfill": job.to_dict() if job else None
+    }
+
 @app.get("/api/keywords")
 async def list_keywords():
     """Get all keywords"""
@@ -91,15 +184,31 @@ async def list_keywords():
 @app.delete("/api/keywords/{keyword_id}")
 async def remove_keyword(keyword_id: int):
     """Delete a keyword"""
+    keyword_backfill.cancel(keyword_id)
     success = await delete_keyword(keyword_id)
     if success:
+        event_bus.publish(KEYWORDS_CHANGED_TOPIC, {"keyword_id": keyword_id, "deleted": True})
         return {"status": "success", "message": "Keyword deleted"}
     raise HTTPException(status_code=404, detail="Keyword not found")
 
+@app.post("/api/keywords/{keyword_id}/backfill", status_code=202)
+async def start_keyword_backfill(keyword_id: int):
+    """Classify earlier ignored posts containing an existing keyword"""
+    keywords = await get_keywords()
+    keyword = next((row['keyword'] for row in keywords if row['id'] == keyword_id), None)
+    if keyword is None:
+        raise HTTPException(status_code=404, detail="Keyword not found")
+    return keyword_backfill.start(keyword_id, keyword).to_dict()
+
+@app.get("/api/keywords/{keyword_id}/backfill")
+async def get_keyword_backfill(keyword_id: int):
+    """Backfill jobs for a keyword, newest first, with their progress"""
+    return {"jobs": keyword_backfill.jobs(keyword_id)}
+
 # ============== POST INGESTION ENDPOINTS ==============
 
 @app.post("/api/posts/ingest", status_code=201)
-async def ingest_post(post: PostCreate, background_tasks: BackgroundTasks):
+async def ingest_post(post: PostCreate):
     """Ingest a single post and queue it for processing"""
     try:
         # Create post in database
@@ -109,8 +218,8 @@ async def ingest_post(post: PostCreate, background_tasks: BackgroundTasks):
             source=post.source
         )
 
-        # Process the post in the background
-        background_tasks.add_task(process_post_and_notify, post_id)
+        # Wake the background workers to process it
+        notify_new_posts()
 
         return {
             "status": "queued",
@@ -121,18 +230,15 @@ async def ingest_post(post: PostCreate, background_tasks: BackgroundTasks):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/posts/bulk-ingest", status_code=201)
-async def bulk_ingest_posts(posts: List[PostCreate], background_tasks: BackgroundTasks):
+async def bulk_ingest_posts(posts: List[PostCreate]):
     """Ingest multiple posts at once"""
     try:
-        post_ids = []
-        for post in posts:
-            post_id = await create_post(
-                text=post.text,
-                timestamp=post.timestamp,
-                source=post.source
-            )
-            post_ids.append(post_id)
-            background_tasks.add_task(process_post_and_notify, post_id)
+        # One executemany insert in a single transaction
+        post_ids = await create_posts_bulk([post.model_dump() for post in posts])
+
+        # One wake-up for the whole batch; workers claim it in batches
+        if post_ids:
+            notify_new_posts()
 
         return {
             "status": "queued",
@@ -142,6 +248,68 @@ async def bulk_ingest_posts(posts: List[PostCreate], background_tasks: Backgroun
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Streams acknowledgements while the request body is still being read
+
+    Starlette's StreamingResponse may listen for client disconnects by
+    reading from `receive`, which would swallow the request body chunks the
+    generator itself is consuming. Here the generator reads the body, and
+    it notices a disconnect from the body stream instead.
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+@app.post("/api/posts/stream-ingest")
+async def stream_ingest_posts(request: Request):
+    """
+    Ingest a newline-delimited JSON stream of posts
+
+    Each line is one post ({"text", "timestamp", "source"}). Posts are
+    stored in chunks as the body arrives, and one JSON line is written back
+    per stored chunk. When the processing backlog is full the server stops
+    reading the body until it drains, which slows the sender down.
+    """
+    async def generate_acks():
+        try:
+            async for ack in ingest_ndjson(request.stream(), notify_new_posts):
+                yield json.dumps(ack) + "\n"
+        except ClientDisconnect:
+            print("Stream ingest closed by client")
+        except Exception as e:
+            yield json.dumps({"status": "error", "error": str(e)}) + "\n"
+
+    return NDJSONStreamingResponse(generate_acks())
+
+@app.get("/api/posts/search")
+async def search(
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    sentiment: Optional[str] = None,
+    keyword: Optional[str] = None,
+    source: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    """
+    Full-text search over post text, best matches first
+
+    `q` supports words, "exact phrases", prefixes (tes*), OR and NOT.
+    Each result has a bm25 `rank` and a `snippet` with matches in <mark> tags.
+    """
+    try:
+        posts = await search_posts(
+            q, limit=limit, offset=offset, sentiment=sentiment,
+            keyword=keyword, source=source, start=start, end=end
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"query": q, "posts": posts, "count": len(posts)}
+
 # ============== MOCK DATA SIMULATION ==============
 
 # Sample posts for simulation
@@ -168,23 +336,23 @@ SAMPLE_POSTS = [
     {"text": "Tesla autopilot is revolutionary. Can't imagine driving without it.", "source": "Twitter"},
 ]
 
-# Global simulation control
-simulation_running = False
+# Held by the worker running the simulation, so only one runs across workers
+SIMULATION_LEASE = "simulation"
 
 @app.post("/api/posts/simulate")
 async def simulate_posts(config: PostsSimulate, background_tasks: BackgroundTasks):
     """Start simulating posts (for demo purposes)"""
-    global simulation_running
-
-    if simulation_running:
+    lease = await event_bus.try_lease(SIMULATION_LEASE)
+    if lease is None:
         return {"status": "already_running", "message": "Simulation already in progress"}
 
     async def run_simulation():
-        global simulation_running
-        simulation_running = True
-
         try:
             for i in range(config.count):
+                if lease.lost.is_set():
+                    # Another worker may have taken over; don't run two at once
+                    break
+
                 # Pick random post
                 sample = random.choice(SAMPLE_POSTS)
 
@@ -202,7 +370,7 @@ async def simulate_posts(config: PostsSimulate, background_tasks: BackgroundTask
                 await asyncio.sleep(config.interval)
 
         finally:
-            simulation_running = False
+            await lease.release()
 
     # Start simulation in background
     asyncio.create_task(run_simulation())
@@ -215,56 +383,182 @@ async def simulate_posts(config: PostsSimulate, background_tasks: BackgroundTask
 @app.get("/api/posts/simulate/status")
 async def get_simulation_status():
     """Check if simulation is running"""
-    return {"running": simulation_running}
+    return {"running": await event_bus.lease_holder(SIMULATION_LEASE) is not None}
 
 # ============== DASHBOARD ENDPOINTS ==============
 
+async def cached_json(request: Request, compute) -> Response:
+    """
+    Serve a polled endpoint from the dashboard response cache
+
+    All clients asking for the same path and query share one computed and
+    serialized body until processed posts (at most once per
+    RESPONSE_CACHE_MIN_FRESH_MS) or a keyword change invalidate it. Clients
+    sending the current ETag in If-None-Match get an empty 304.
+    """
+    key = request.url.path + "?" + "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    entry = await dashboard_cache.get_or_compute(key, compute)
+    # Browsers must revalidate every poll, which is cheap with the ETag
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        dashboard_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
 @app.get("/api/dashboard/stats")
-async def get_stats():
-    """Get dashboard statistics"""
-    stats = await get_dashboard_stats()
-    return stats
+async def get_stats(request: Request, keyword: Optional[str] = None):
+    """Get dashboard statistics, optionally for one keyword"""
+    return await cached_json(request, lambda: get_dashboard_stats(keyword))
+
+@app.get("/api/dashboard/keywords")
+async def get_keywords_stats(request: Request):
+    """
+    Statistics per tracked keyword, most mentioned first
+
+    Posts mentioning several keywords count under each of them.
+    """
+    async def compute():
+        return {"keywords": await get_keyword_stats()}
+    return await cached_json(request, compute)
+
+def encode_feed_cursor(post: dict) -> str:
+    """Opaque token pointing just past a post in the feed order"""
+    payload = json.dumps([post["timestamp"], post["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_feed_cursor(cursor: str) -> tuple:
+    """(timestamp, id) from a token made by encode_feed_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, post_id = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(timestamp, str) or not isinstance(post_id, int):
+            raise ValueError
+        return timestamp, post_id
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @app.get("/api/dashboard/recent")
-async def get_recent():
-    """Get recent processed posts"""
-    posts = await get_recent_posts(limit=20)
-    return {"posts": posts}
+async def get_recent(
+    request: Request,
+    limit: int = Query(20, ge=1, le=200),
+    keyword: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    source: Optional[str] = None,
+    cursor: Optional[str] = None
+):
+    """
+    Get recent processed posts, newest first
+
+    Pass `next_cursor` from a response as `cursor` to get the next page;
+    it's null once there are no older posts.
+    """
+    before = decode_feed_cursor(cursor) if cursor else None
+
+    async def compute():
+        # One extra row tells us whether another page exists
+        posts = await get_recent_posts(
+            limit=limit + 1,
+            keyword=keyword,
+            sentiment=sentiment,
+            source=source,
+            before=before
+        )
+        next_cursor = encode_feed_cursor(posts[limit - 1]) if len(posts) > limit else None
+        return {"posts": posts[:limit], "next_cursor": next_cursor}
+
+    return await cached_json(request, compute)
 
 @app.get("/api/dashboard/trends")
-async def get_trends(hours: int = 24):
+async def get_trends(request: Request, hours: int = 24):
     """Get hourly sentiment trends"""
-    trends = await get_hourly_trends(hours=hours)
-    return {"trends": trends}
+    async def compute():
+        return {"trends": await get_hourly_trends(hours=hours)}
+
+    return await cached_json(request, compute)
+
+@app.get("/api/trends")
+async def get_trend_series(
+    request: Request,
+    resolution: str = "hour",
+    keyword: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    """
+    Sentiment counts per minute, 5min, hour or day bucket, optionally for one keyword
+
+    Naive times are compared with post timestamps as they are, aware times
+    are converted to UTC first. `end` defaults to now (UTC) and `start` to
+    24 hours before `end`.
+    """
+    # Open-ended windows slide with the clock, which the cache TTL covers
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(hours=24)
+
+    async def compute():
+        try:
+            trends = await get_sentiment_trends(resolution, start, end, keyword)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        return {
+            "resolution": resolution,
+            "keyword": keyword,
+            "trends": trends
+        }
+
+    return await cached_json(request, compute)
+
+@app.get("/api/alerts")
+async def get_alerts(keyword: Optional[str] = None, limit: int = Query(50, ge=1, le=200)):
+    """
+    Recent sentiment and volume spike alerts, newest first
+
+    The same alerts are pushed live on /api/events as `event: alert`.
+    `status` has the current recent vs baseline figures per keyword
+    (keyword null is all keywords together).
+    """
+    return {
+        "alerts": spike_detector.recent_alerts(keyword.lower() if keyword else None, limit),
+        "status": spike_detector.snapshot()
+    }
 
 # ============== REAL-TIME SSE ENDPOINT ==============
 
 @app.get("/api/events")
-async def event_stream():
+async def event_stream(request: Request):
     """
     Server-Sent Events (SSE) endpoint for real-time updates
-    Streams newly processed posts to connected clients
+    Streams newly processed posts to every connected client
+
+    Reconnecting clients send Last-Event-ID and get the events they
+    missed, as long as those are still in the replay buffer.
     """
+    last_event_id = request.headers.get("last-event-id")
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    subscription = event_broadcaster.subscribe(last_event_id)
+
     async def generate_events():
         try:
             while True:
-                # Wait for new processed posts
-                try:
-                    # Use wait_for with timeout to keep connection alive
-                    post_data = await asyncio.wait_for(
-                        processed_posts_queue.get(),
-                        timeout=30.0
-                    )
-
-                    # Send the post data as SSE event
-                    yield f"data: {json.dumps(post_data)}\n\n"
-
-                except asyncio.TimeoutError:
+                # Wait with timeout to keep connection alive
+                frames = await subscription.next_frames(timeout=30.0)
+
+                if frames:
+                    # Frames are already serialized by the broadcaster
+                    yield "".join(frames)
+                else:
                     # Send heartbeat to keep connection alive
                     yield f": heartbeat\n\n"
 
         except asyncio.CancelledError:
             print("SSE connection closed by client")
+        finally:
+            event_broadcaster.unsubscribe(subscription)
 
     return StreamingResponse(
         generate_events(),
@@ -291,14 +585,52 @@ async def health_check():
     """Detailed health check"""
     keywords = await get_keywords()
     stats = await get_dashboard_stats()
+    partitions = await get_post_partitions()
 
     return {
         "status": "healthy",
         "database": "connected",
         "keywords_count": len(keywords),
         "total_posts": stats["total_mentions"],
-        "background_processor": "running" if background_processor_started else "stopped"
+        # "standby" workers take over if the one running the background jobs stops
+        "background_processor": (
+            "running" if event_bus.is_leader else "standby" if background_processor_started else "stopped"
+        ),
+        "ready": is_model_ready(),
+        "model": model_status["state"],
+        "sentiment_cache": sentiment_cache.stats(),
+        "near_duplicates": near_duplicate_index.stats(),
+        "response_cache": dashboard_cache.stats(),
+        "keyword_backfills": [
+            job for job in keyword_backfill.jobs() if job["status"] in ("queued", "running")
+        ],
+        "sse_subscribers": event_broadcaster.subscriber_count,
+        "event_bus": event_bus.stats(),
+        "archived_partitions": len(partitions),
+        "archived_posts": sum(partition["row_count"] for partition in partitions),
+        "inference_pool": inference_pool.stats() if inference_pool is not None else None
+    }
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: 200 once the sentiment model is warm, 503 until then"""
+    body = {
+        "ready": is_model_ready(),
+        "model": model_status["state"],
+        "error": model_status["error"]
     }
+    if not body["ready"]:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Hot-path metrics in the Prometheus text format"""
+    PENDING_POSTS.set(await count_pending_posts())
+    return PlainTextResponse(
+        REGISTRY.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 # Run the application
 if __name__ == "__main__":
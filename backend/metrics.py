@@ -0,0 +1,306 @@
+import bisect
+import math
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets (seconds) for calls that are usually sub-millisecond
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Latency buckets (seconds) for model calls and whole-pipeline timings
+SLOW_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+class _Metric:
+    """
+    Base class: a named metric with optional labels
+
+    Each distinct combination of label values gets its own child holding
+    the actual numbers. Children are created once and cached, so hot paths
+    should keep a reference to the child (metric.labels(...)) rather than
+    looking it up per call. Updates happen on the event loop or under the
+    GIL, so no locking is done.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional["MetricsRegistry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            # Report zero before the first update
+            self.labels()
+        (registry or REGISTRY).register(self)
+
+    def labels(self, *values: str, **labels: str):
+        """Get the child for one combination of label values"""
+        if labels:
+            values = tuple(str(labels[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(value) for value in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _default(self):
+        """The unlabelled child, for metrics without labels"""
+        if self.labelnames:
+            raise ValueError(f"{self.name} needs labels {self.labelnames}")
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """(suffix, label string, value) for every series of this metric"""
+        raise NotImplementedError
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+class Counter(_Metric):
+    """A value that only goes up (events, outcomes, items processed)"""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def samples(self):
+        return [
+            ("", _format_labels(self.labelnames, values), child.value)
+            for values, child in self._children.items()
+        ]
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the value from `function` whenever metrics are collected"""
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return math.nan
+        return self.value
+
+class Gauge(_Metric):
+    """A value that goes up and down (queue depth, connected clients)"""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+    def set_function(self, function: Callable[[], float]):
+        self._default().set_function(function)
+
+    def samples(self):
+        return [
+            ("", _format_labels(self.labelnames, values), child.get())
+            for values, child in self._children.items()
+        ]
+
+class _HistogramChild:
+    __slots__ = ("upper_bounds", "counts", "sum", "count")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        # Per-bucket counts; they're made cumulative only when rendered
+        self.counts[bisect.bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self):
+        """Observe the duration of the with-block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+class Histogram(_Metric):
+    """Distribution of observed values (latencies, batch sizes) in fixed buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = FAST_BUCKETS,
+                 registry: Optional["MetricsRegistry"] = None):
+        self.upper_bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.upper_bounds)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def samples(self):
+        samples = []
+        for values, child in self._children.items():
+            cumulative = 0
+            for upper_bound, count in zip(self.upper_bounds + (math.inf,), child.counts):
+                cumulative += count
+                labels = _format_labels(
+                    self.labelnames + ("le",), values + (_format_value(upper_bound),)
+                )
+                samples.append(("_bucket", labels, cumulative))
+            labels = _format_labels(self.labelnames, values)
+            samples.append(("_sum", labels, child.sum))
+            samples.append(("_count", labels, child.count))
+        return samples
+
+class MetricsRegistry:
+    """All metrics of the process, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+# Hot-path metrics, shared by the modules that record them
+
+DB_CALL_SECONDS = Histogram(
+    "pulse_db_call_seconds",
+    "Latency of database.py calls, including waiting for a connection",
+    ["operation"]
+)
+KEYWORD_MATCH_SECONDS = Histogram(
+    "pulse_keyword_match_seconds",
+    "Time spent matching keywords against a batch of posts"
+)
+INFERENCE_BATCH_SECONDS = Histogram(
+    "pulse_inference_batch_seconds",
+    "Latency of one batched model call",
+    buckets=SLOW_BUCKETS
+)
+INFERENCE_BATCH_SIZE = Histogram(
+    "pulse_inference_batch_size",
+    "Texts per batched model call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+)
+INGEST_TO_PROCESSED_SECONDS = Histogram(
+    "pulse_ingest_to_processed_seconds",
+    "Time from a post being stored to its sentiment being stored",
+    buckets=SLOW_BUCKETS
+)
+POSTS_INGESTED = Counter(
+    "pulse_posts_ingested_total",
+    "Posts stored for processing"
+)
+INGEST_BACKPRESSURE_SECONDS = Counter(
+    "pulse_ingest_backpressure_seconds_total",
+    "Time streaming ingest spent paused because the processing backlog was full"
+)
+POSTS_OUTCOMES = Counter(
+    "pulse_posts_processed_total",
+    "Post processing outcomes (processed, ignored, skipped or error)",
+    ["outcome"]
+)
+NEAR_DUPLICATES = Counter(
+    "pulse_near_duplicates_total",
+    "Posts that reused a near-identical post's sentiment instead of being classified"
+)
+KEYWORD_BACKFILL_POSTS = Counter(
+    "pulse_keyword_backfill_posts_total",
+    "Previously ignored posts classified by a keyword backfill"
+)
+SPIKE_ALERTS = Counter(
+    "pulse_spike_alerts_total",
+    "Spike alerts raised (negative_spike or volume_spike)",
+    ["type"]
+)
+PENDING_POSTS = Gauge(
+    "pulse_pending_posts",
+    "Posts waiting to be processed"
+)
+SSE_SUBSCRIBERS = Gauge(
+    "pulse_sse_subscribers",
+    "Connected SSE clients"
+)
+QUEUE_SIZE = Gauge(
+    "pulse_queue_size",
+    "Items waiting in in-process queues",
+    ["queue"]
+)
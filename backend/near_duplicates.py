@@ -0,0 +1,179 @@
+import hashlib
+import os
+import re
+import time
+from array import array
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# Reuse the sentiment of a recent near-identical post instead of classifying again
+NEAR_DUP_DETECTION = os.getenv("NEAR_DUP_DETECTION", "1") != "0"
+
+# Min estimated Jaccard similarity (of words and word pairs) to count as a near-duplicate
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.7"))
+
+# How long (seconds) a classified post can serve as the original for later copies
+NEAR_DUP_WINDOW_SECONDS = float(os.getenv("NEAR_DUP_WINDOW_SECONDS", "3600"))
+
+# Originals remembered at most, oldest dropped first
+NEAR_DUP_MAX_ENTRIES = int(os.getenv("NEAR_DUP_MAX_ENTRIES", "100000"))
+
+# Shorter texts have too few words for a meaningful comparison
+NEAR_DUP_MIN_TOKENS = int(os.getenv("NEAR_DUP_MIN_TOKENS", "5"))
+
+# MinHash signature length, split into LSH bands of SIGNATURE_SIZE // LSH_BANDS values.
+# With 16 bands of 4, pairs at 0.7 similarity become candidates ~98% of the
+# time and pairs at 0.3 about 12% of the time (then rejected on comparison).
+SIGNATURE_SIZE = 64
+LSH_BANDS = 16
+
+_URL = re.compile(r"https?://\S+|www\.\S+")
+_MENTION = re.compile(r"@\w+")
+_NON_WORD = re.compile(r"[\W_]+")
+
+Signature = Tuple[int, ...]
+
+def _tokens(text: str) -> List[str]:
+    """Words of a post, ignoring case, URLs, @handles, punctuation and emoji"""
+    text = _MENTION.sub(" ", _URL.sub(" ", text.lower()))
+    tokens = _NON_WORD.sub(" ", text).split()
+    # Retweets repeat the original behind "RT @handle:"
+    if tokens and tokens[0] == "rt":
+        tokens = tokens[1:]
+    return tokens
+
+@lru_cache(maxsize=65536)
+def _feature_hashes(feature: str) -> array:
+    """
+    SIGNATURE_SIZE independent 32-bit hashes of one feature
+
+    One SHAKE-128 digest stands in for SIGNATURE_SIZE hash functions.
+    Words repeat a lot across posts, so the digests are cached.
+    """
+    return array("I", hashlib.shake_128(feature.encode("utf-8")).digest(4 * SIGNATURE_SIZE))
+
+def minhash(text: str) -> Optional[Signature]:
+    """
+    MinHash signature of a post's words and word pairs
+
+    The fraction of positions where two signatures agree estimates the
+    Jaccard similarity of the two posts' feature sets, so copies that
+    differ only in a handle, link, emoji or a word or two stay close.
+    Returns None for texts with fewer than NEAR_DUP_MIN_TOKENS words.
+    """
+    tokens = _tokens(text)
+    if len(tokens) < NEAR_DUP_MIN_TOKENS:
+        return None
+
+    features = set(tokens)
+    features.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    # Per hash function, the smallest value over all features
+    return tuple(map(min, zip(*map(_feature_hashes, features))))
+
+def similarity(a: Signature, b: Signature) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+class NearDuplicate:
+    """A classified post that later near-identical posts can copy"""
+
+    __slots__ = ("signature", "post_id", "sentiment", "added")
+
+    def __init__(self, signature: Signature, post_id: int, sentiment: Optional[Dict]):
+        self.signature = signature
+        self.post_id = post_id
+        self.sentiment = sentiment
+        self.added = time.monotonic()
+
+class NearDuplicateIndex:
+    """
+    MinHash signatures of recent posts with a banded LSH index
+
+    Each signature is cut into LSH_BANDS bands; posts sharing any whole
+    band are candidates, and only candidates are compared, so a lookup
+    doesn't scan the whole window.
+
+    Args:
+        threshold: Min estimated similarity for a match
+        window_seconds: How long an entry stays searchable
+        max_entries: Entries kept at most (oldest dropped first)
+    """
+
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD,
+                 window_seconds: float = NEAR_DUP_WINDOW_SECONDS,
+                 max_entries: int = NEAR_DUP_MAX_ENTRIES):
+        self.threshold = threshold
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self._rows = SIGNATURE_SIZE // LSH_BANDS
+        self._buckets: List[Dict[Signature, List[NearDuplicate]]] = [{} for _ in range(LSH_BANDS)]
+        self._entries: "deque[NearDuplicate]" = deque()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _bands(self, signature: Signature) -> List[Signature]:
+        rows = self._rows
+        return [signature[start:start + rows] for start in range(0, SIGNATURE_SIZE, rows)]
+
+    def _expire(self):
+        """Drop entries that left the time window or overflow max_entries"""
+        cutoff = time.monotonic() - self.window_seconds
+        while self._entries and (
+            self._entries[0].added < cutoff or len(self._entries) > self.max_entries
+        ):
+            entry = self._entries.popleft()
+            for buckets, band in zip(self._buckets, self._bands(entry.signature)):
+                bucket = buckets[band]
+                bucket.remove(entry)
+                if not bucket:
+                    del buckets[band]
+
+    def find(self, signature: Signature) -> Optional[NearDuplicate]:
+        """The most similar entry at or above the threshold, or None"""
+        self._expire()
+        best = None
+        best_similarity = self.threshold
+        seen = set()
+        for buckets, band in zip(self._buckets, self._bands(signature)):
+            for entry in buckets.get(band, ()):
+                if id(entry) in seen:
+                    continue
+                seen.add(id(entry))
+                score = similarity(signature, entry.signature)
+                if score >= best_similarity:
+                    best, best_similarity = entry, score
+        if best is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return best
+
+    def add(self, signature: Signature, post_id: int, sentiment: Optional[Dict] = None) -> NearDuplicate:
+        """Remember a post as the original for later near-duplicates"""
+        entry = NearDuplicate(signature, post_id, sentiment)
+        self._entries.append(entry)
+        for buckets, band in zip(self._buckets, self._bands(signature)):
+            buckets.setdefault(band, []).append(entry)
+        self._expire()
+        return entry
+
+    def entries(self) -> List[NearDuplicate]:
+        return list(self._entries)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+# Originals seen by this process within the window
+near_duplicate_index = NearDuplicateIndex()
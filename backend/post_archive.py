@@ -0,0 +1,177 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from database import (
+    BUCKET_FORMAT,
+    DATABASE_PATH,
+    get_oldest_post,
+    find_last_post_created_before,
+    count_unfinished_posts,
+    fence_post_range,
+    unfence_post_range,
+    copy_posts_to_partition,
+    register_post_partition,
+    delete_hot_posts,
+    get_post_partitions,
+    remove_post_partition
+)
+
+# Posts are archived per "day" or per "week" of ingest time (UTC)
+POSTS_PARTITION_PERIOD = os.getenv("POSTS_PARTITION_PERIOD", "day")
+
+# Days of posts kept in the hot posts table before their period is archived
+POSTS_HOT_DAYS = float(os.getenv("POSTS_HOT_DAYS", "7"))
+
+# Days after which archived partitions are deleted outright (0 keeps them forever)
+POSTS_RETENTION_DAYS = float(os.getenv("POSTS_RETENTION_DAYS", "0"))
+
+# Blank out post text in archived partitions (sentiment and rollups are kept)
+ARCHIVE_STRIP_TEXT = os.getenv("ARCHIVE_STRIP_TEXT", "0") != "0"
+
+# Seconds between archive/retention passes
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+
+# Where partition files are written
+POSTS_ARCHIVE_DIR = os.getenv(
+    "POSTS_ARCHIVE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(DATABASE_PATH)), "archive")
+)
+
+def period_bounds(moment: datetime) -> Tuple[str, datetime, datetime]:
+    """Name, start and end of the partition period containing `moment`"""
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+    if POSTS_PARTITION_PERIOD == "week":
+        start = day - timedelta(days=day.weekday())
+        year, week, _ = start.isocalendar()
+        return f"{year}-W{week:02d}", start, start + timedelta(days=7)
+    return day.strftime("%Y-%m-%d"), day, day + timedelta(days=1)
+
+async def _archive_range(period: str, start: datetime, end: datetime, first_id: int, last_id: int) -> Dict:
+    """Copy one period's posts into a read-only partition file, then drop them from the hot table"""
+    os.makedirs(POSTS_ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(POSTS_ARCHIVE_DIR, f"posts_{period}_{first_id}.db")
+    if os.path.exists(path):
+        # Left over from a pass that was interrupted before cataloguing it
+        os.chmod(path, 0o644)
+        os.remove(path)
+
+    try:
+        row_count = await copy_posts_to_partition(path, first_id, last_id, ARCHIVE_STRIP_TEXT)
+    except Exception:
+        # Not archived after all; let backfills at the range again
+        await unfence_post_range(first_id)
+        raise
+    os.chmod(path, 0o444)
+
+    partition = {
+        "first_id": first_id,
+        "last_id": last_id,
+        "period": period,
+        "period_start": start.strftime(BUCKET_FORMAT),
+        "period_end": end.strftime(BUCKET_FORMAT),
+        "path": path,
+        "row_count": row_count,
+        "text_stripped": ARCHIVE_STRIP_TEXT
+    }
+    # Catalogued before the hot rows go, so lookups never miss them
+    await register_post_partition(partition)
+    await delete_hot_posts(first_id, last_id)
+    await unfence_post_range(first_id)
+    return partition
+
+async def archive_old_posts() -> List[Dict]:
+    """
+    Move every fully processed period older than the hot window into its own file
+
+    Periods that still have unfinished (pending or claimed) posts stay
+    hot and are retried on the next pass. Each period's posts form a
+    contiguous ID range, since IDs follow ingest order.
+
+    Returns:
+        list: The partitions created
+    """
+    cutoff = datetime.utcnow() - timedelta(days=POSTS_HOT_DAYS)
+    catalogued = {partition['first_id'] for partition in await get_post_partitions()}
+
+    archived = []
+    after_id = 0
+    while True:
+        oldest = await get_oldest_post(after_id)
+        if oldest is None:
+            break
+        period, start, end = period_bounds(datetime.fromisoformat(oldest['created_at']))
+        if end > cutoff:
+            break
+
+        first_id = oldest['id']
+        last_id = await find_last_post_created_before(end.strftime(BUCKET_FORMAT), after_id)
+        # Only if the clock went backwards mid-period; keep making progress
+        last_id = max(last_id or first_id, first_id)
+        after_id = last_id
+
+        if first_id in catalogued:
+            # Copied on an earlier pass that stopped before clearing the hot rows
+            await delete_hot_posts(first_id, last_id)
+            await unfence_post_range(first_id)
+            continue
+
+        # Fenced first, so no backfill changes the range after it's checked
+        await fence_post_range(first_id, last_id)
+        unfinished = await count_unfinished_posts(first_id, last_id)
+        if unfinished:
+            await unfence_post_range(first_id)
+            print(f"Not archiving {period} yet: {unfinished} posts still unfinished")
+            continue
+
+        partition = await _archive_range(period, start, end, first_id, last_id)
+        print(f"Archived {partition['row_count']} posts from {period} to {partition['path']}")
+        archived.append(partition)
+
+    return archived
+
+async def drop_expired_partitions() -> List[Dict]:
+    """
+    Delete archived partitions older than the retention period
+
+    Whole files are removed, so retention costs the same however many
+    posts a partition holds. Their sentiment stays in the rollups.
+
+    Returns:
+        list: The partitions dropped
+    """
+    if POSTS_RETENTION_DAYS <= 0:
+        return []
+
+    cutoff = (datetime.utcnow() - timedelta(days=POSTS_RETENTION_DAYS)).strftime(BUCKET_FORMAT)
+    dropped = []
+    for partition in await get_post_partitions():
+        if partition['period_end'] > cutoff:
+            break
+        await remove_post_partition(partition['first_id'])
+        try:
+            os.chmod(partition['path'], 0o644)
+            os.remove(partition['path'])
+        except FileNotFoundError:
+            pass
+        print(f"Dropped partition {partition['period']} ({partition['row_count']} posts)")
+        dropped.append(partition)
+
+    return dropped
+
+async def run_archive_maintenance() -> Dict:
+    """One archive and retention pass"""
+    archived = await archive_old_posts()
+    dropped = await drop_expired_partitions()
+    return {"archived": archived, "dropped": dropped}
+
+async def archive_maintenance_background(interval: float = ARCHIVE_INTERVAL_SECONDS):
+    """Run archive and retention passes forever"""
+    print(f"Starting post archiver (every {interval:g}s, {POSTS_HOT_DAYS:g} hot days)...")
+    while True:
+        try:
+            await run_archive_maintenance()
+        except Exception as e:
+            print(f"Error archiving posts: {e}")
+        await asyncio.sleep(interval)
@@ -1,53 +1,122 @@
 import asyncio
+import os
+import time
 from typing import Optional, List
+from datetime import datetime, timezone
 from database import (
     get_post,
     get_keywords,
+    get_keywords_version,
     update_post_sentiment,
+    update_posts_sentiment_bulk,
     mark_post_ignored,
-    get_pending_posts
+    mark_posts_ignored,
+    claim_posts,
+    claim_pending_posts
 )
-from sentiment_analyzer import analyze_sentiment
+from event_bus import POSTS_INGESTED_TOPIC, broadcast, event_bus, run_together
+from response_cache import dashboard_cache
+from spike_detector import spike_detector
+from keyword_matcher import KeywordMatcher
+from metrics import (
+    INGEST_TO_PROCESSED_SECONDS,
+    KEYWORD_MATCH_SECONDS,
+    NEAR_DUPLICATES,
+    POSTS_OUTCOMES,
+    SPIKE_ALERTS
+)
+from near_duplicates import NEAR_DUP_DETECTION, NearDuplicateIndex, minhash, near_duplicate_index
+from sentiment_analyzer import analyze_sentiment, analyze_sentiment_batch
 
-def matches_any_keyword(text: str, keywords: List[str]) -> Optional[str]:
-    """
-    Check if text contains any of the keywords
+# Posts fetched, classified and written together by the batch path
+PROCESS_BATCH_SIZE = int(os.getenv("PROCESS_BATCH_SIZE", "256"))
 
-    Args:
-        text: The text to search in
-        keywords: List of keywords to search for
+# Background workers claiming pending posts, and how long a claim is held
+PROCESSOR_WORKERS = int(os.getenv("PROCESSOR_WORKERS", "2"))
+PROCESSOR_LEASE_SECONDS = float(os.getenv("PROCESSOR_LEASE_SECONDS", "60"))
 
-    Returns:
-        The matched keyword, or None if no match
-    """
-    text_lower = text.lower()
-    for keyword in keywords:
-        if keyword.lower() in text_lower:
-            return keyword
-    return None
+# Set whenever new posts are ingested so idle workers wake up immediately
+work_available = asyncio.Event()
+
+def notify_new_posts():
+    """Wake the background workers (in whichever process runs them) after posts are ingested"""
+    event_bus.publish(POSTS_INGESTED_TOPIC)
+
+event_bus.subscribe(POSTS_INGESTED_TOPIC, lambda data, event_id, local: work_available.set())
+
+# Matcher for the tracked keywords, rebuilt only when the keyword set changes
+_keyword_matcher: Optional[KeywordMatcher] = None
+_keyword_matcher_version = -1
+
+async def get_keyword_matcher() -> KeywordMatcher:
+    """Get the matcher for the current keywords, rebuilding it after keyword CRUD"""
+    global _keyword_matcher, _keyword_matcher_version
+
+    version = get_keywords_version()
+    if _keyword_matcher is None or _keyword_matcher_version != version:
+        keyword_rows = await get_keywords()
+        _keyword_matcher = KeywordMatcher(row['keyword'] for row in keyword_rows)
+        _keyword_matcher_version = version
+
+    return _keyword_matcher
+
+def _observe_ingest_latency(posts: List[dict]):
+    """Record how long each just-processed post waited since it was ingested"""
+    now = time.time()
+    for post in posts:
+        try:
+            # created_at is SQLite's UTC "YYYY-MM-DD HH:MM:SS[.SSS]"
+            created = datetime.fromisoformat(post['created_at']).replace(tzinfo=timezone.utc)
+        except (KeyError, TypeError, ValueError):
+            continue
+        INGEST_TO_PROCESSED_SECONDS.observe(max(0.0, now - created.timestamp()))
+
+def _near_duplicate_signature(text: str):
+    """MinHash signature for near-duplicate lookups, or None when detection is off"""
+    return minhash(text) if NEAR_DUP_DETECTION else None
+
+def _remember_original(signature, post_id: int, sentiment: dict):
+    """Let later near-duplicates copy this post's sentiment (unless the model failed)"""
+    if signature is not None and sentiment.get('raw_label') != "ERROR":
+        near_duplicate_index.add(signature, post_id, sentiment)
+
+def _count_outcomes(results: List[dict]):
+    for result in results:
+        POSTS_OUTCOMES.labels(outcome=result["status"]).inc()
 
 async def process_single_post(post_id: int) -> dict:
     """
     Process a single post:
-    1. Fetch post from database
-    2. Check if it matches any keyword
-    3. If match: run sentiment analysis
+    1. Claim the post (so no background worker processes it too)
+    2. Find every keyword it matches
+    3. If match: reuse a recent near-duplicate's sentiment, or run sentiment analysis
     4. Update post in database
 
     Returns:
         dict: Processing result with status and data
     """
+    result = await _process_single_post(post_id)
+    _count_outcomes([result])
+    return result
+
+async def _process_single_post(post_id: int) -> dict:
     try:
-        # Get the post
-        post = await get_post(post_id)
-        if not post:
-            return {"status": "error", "message": "Post not found"}
+        # Claim the post
+        claimed = await claim_posts([post_id], PROCESSOR_LEASE_SECONDS)
+        if not claimed:
+            if not await get_post(post_id):
+                return {"status": "error", "message": "Post not found"}
+            return {
+                "status": "skipped",
+                "message": "Post already processed or claimed",
+                "post_id": post_id
+            }
+        post = claimed[0]
 
-        # Get active keywords
-        keyword_rows = await get_keywords()
-        keywords = [row['keyword'] for row in keyword_rows]
+        # Get matcher for active keywords
+        matcher = await get_keyword_matcher()
 
-        if not keywords:
+        if not matcher.keywords:
             # No keywords configured, mark as ignored
             await mark_post_ignored(post_id)
             return {
@@ -56,10 +125,11 @@ async def process_single_post(post_id: int) -> dict:
                 "post_id": post_id
             }
 
-        # Check for keyword match
-        matched_keyword = matches_any_keyword(post['text'], keywords)
+        # Check for keyword matches (the first is the primary one)
+        with KEYWORD_MATCH_SECONDS.time():
+            keywords = matcher.match_all(post['text'])
 
-        if not matched_keyword:
+        if not keywords:
             # No keyword match, ignore this post
             await mark_post_ignored(post_id)
             return {
@@ -68,16 +138,29 @@ async def process_single_post(post_id: int) -> dict:
                 "post_id": post_id
             }
 
-        # Keyword matched! Run sentiment analysis
-        sentiment_result = await analyze_sentiment(post['text'])
+        # Keyword matched! Copy a near-duplicate's sentiment or run sentiment analysis
+        signature = _near_duplicate_signature(post['text'])
+        original = near_duplicate_index.find(signature) if signature is not None else None
+        if original is not None:
+            sentiment_result = original.sentiment
+            duplicate_of = original.post_id
+            NEAR_DUPLICATES.inc()
+        else:
+            sentiment_result = await analyze_sentiment(post['text'])
+            duplicate_of = None
 
         # Update post with results
         await update_post_sentiment(
             post_id=post_id,
             sentiment_label=sentiment_result['sentiment'],
             sentiment_score=sentiment_result['confidence'],
-            keyword_matched=matched_keyword
+            keyword_matched=keywords[0],
+            duplicate_of=duplicate_of,
+            keywords=keywords
         )
+        _observe_ingest_latency([post])
+        if original is None:
+            _remember_original(signature, post_id, sentiment_result)
 
         # Return the processed post data
         return {
@@ -86,9 +169,11 @@ async def process_single_post(post_id: int) -> dict:
             "text": post['text'],
             "timestamp": post['timestamp'],
             "source": post['source'],
-            "keyword_matched": matched_keyword,
+            "keyword_matched": keywords[0],
+            "keywords": keywords,
             "sentiment": sentiment_result['sentiment'],
-            "confidence": sentiment_result['confidence']
+            "confidence": sentiment_result['confidence'],
+            "duplicate_of": duplicate_of
         }
 
     except Exception as e:
@@ -99,40 +184,188 @@ async def process_single_post(post_id: int) -> dict:
             "post_id": post_id
         }
 
-async def process_pending_posts_background():
+async def process_posts_batch(post_ids: List[int]) -> List[dict]:
+    """
+    Claim and process many posts with one fetch, one inference batch and
+    one write per chunk of PROCESS_BATCH_SIZE posts
+
+    Posts already processed or claimed elsewhere are skipped.
+
+    Returns:
+        list: Processing results in the same shape as process_single_post
+    """
+    results = []
+    for start in range(0, len(post_ids), PROCESS_BATCH_SIZE):
+        chunk = post_ids[start:start + PROCESS_BATCH_SIZE]
+        posts = await claim_posts(chunk, PROCESSOR_LEASE_SECONDS)
+        results.extend(await process_claimed_posts(posts))
+    return results
+
+async def process_claimed_posts(posts: List[dict], observe_latency: bool = True) -> List[dict]:
+    """
+    Match, classify and store a batch of posts already claimed by the caller
+
+    Args:
+        posts: Claimed posts
+        observe_latency: Record ingest-to-processed latency (off for
+                         reprocessed old posts, which would skew it)
+
+    Returns:
+        list: Processing results in the same shape as process_single_post
+    """
+    try:
+        results = await _process_claimed_posts(posts, observe_latency)
+    except Exception as e:
+        # Leases stay in place, so the posts are retried once they expire
+        print(f"Error processing batch of {len(posts)} posts: {e}")
+        results = [
+            {"status": "error", "message": str(e), "post_id": post['id']}
+            for post in posts
+        ]
+    _count_outcomes(results)
+    return results
+
+async def _process_claimed_posts(posts: List[dict], observe_latency: bool) -> List[dict]:
+    matcher = await get_keyword_matcher()
+
+    results = []
+    matched = []
+    ignored_ids = []
+    with KEYWORD_MATCH_SECONDS.time():
+        for post in posts:
+            keywords = matcher.match_all(post['text'])
+            if keywords:
+                matched.append((post, keywords))
+            else:
+                ignored_ids.append(post['id'])
+                results.append({
+                    "status": "ignored",
+                    "message": "No keyword match" if matcher.keywords else "No keywords configured",
+                    "post_id": post['id']
+                })
+
+    await mark_posts_ignored(ignored_ids)
+
+    if not matched:
+        return results
+
+    # Near-duplicates of recent posts, or of earlier posts in this batch,
+    # copy that post's sentiment; only the rest go to the model
+    batch_originals = NearDuplicateIndex(window_seconds=float("inf"))
+    originals = []
+    to_classify = []
+    for post, _ in matched:
+        signature = _near_duplicate_signature(post['text'])
+        original = None
+        if signature is not None:
+            original = near_duplicate_index.find(signature) or batch_originals.find(signature)
+            if original is None:
+                batch_originals.add(signature, post['id'])
+        originals.append(original)
+        if original is None:
+            to_classify.append(post)
+
+    classified = await analyze_sentiment_batch([post['text'] for post in to_classify])
+    sentiment_by_id = {post['id']: sentiment for post, sentiment in zip(to_classify, classified)}
+    for entry in batch_originals.entries():
+        entry.sentiment = sentiment_by_id[entry.post_id]
+
+    sentiments = []
+    for (post, _), original in zip(matched, originals):
+        sentiments.append(sentiment_by_id[post['id']] if original is None else original.sentiment)
+    NEAR_DUPLICATES.inc(len(matched) - len(to_classify))
+
+    await update_posts_sentiment_bulk([
+        {
+            "post_id": post['id'],
+            "sentiment_label": sentiment['sentiment'],
+            "sentiment_score": sentiment['confidence'],
+            "keyword_matched": keywords[0],
+            "duplicate_of": original.post_id if original is not None else None,
+            "keywords": keywords
+        }
+        for (post, keywords), sentiment, original in zip(matched, sentiments, originals)
+    ])
+    if observe_latency:
+        _observe_ingest_latency([post for post, _ in matched])
+
+    # Stored, so later batches can copy them too
+    for entry in batch_originals.entries():
+        _remember_original(entry.signature, entry.post_id, entry.sentiment)
+
+    for (post, keywords), sentiment, original in zip(matched, sentiments, originals):
+        results.append({
+            "status": "processed",
+            "post_id": post['id'],
+            "text": post['text'],
+            "timestamp": post['timestamp'],
+            "source": post['source'],
+            "keyword_matched": keywords[0],
+            "keywords": keywords,
+            "sentiment": sentiment['sentiment'],
+            "confidence": sentiment['confidence'],
+            "duplicate_of": original.post_id if original is not None else None
+        })
+
+    return results
+
+async def process_pending_posts_background(workers: int = PROCESSOR_WORKERS):
     """
-    Background task that continuously processes pending posts
-    This runs in the background and checks for new posts every 2 seconds
+    Background task that processes pending posts
+
+    Runs `workers` concurrent workers. Each one claims a batch of pending
+    posts (or posts whose lease expired), processes it through the batch
+    inference path, and sleeps until new posts are ingested. Idle workers
+    still wake up once per lease period to recover expired claims.
     """
-    print("Starting background post processor...")
+    print(f"Starting background post processor with {workers} workers...")
+    await run_together(*[_pending_posts_worker() for _ in range(max(1, workers))])
 
+async def _pending_posts_worker():
+    """Claim and process batches until there's nothing left, then wait for more"""
     while True:
         try:
-            # Get all pending posts
-            pending = await get_pending_posts()
+            # Clear before claiming so a post ingested mid-claim still wakes us
+            work_available.clear()
+            posts = await claim_pending_posts(PROCESS_BATCH_SIZE, PROCESSOR_LEASE_SECONDS)
+
+            if not posts:
+                try:
+                    await asyncio.wait_for(work_available.wait(), timeout=PROCESSOR_LEASE_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
 
-            if pending:
-                print(f"Processing {len(pending)} pending posts...")
-                for post in pending:
-                    result = await process_single_post(post['id'])
-                    if result['status'] == 'processed':
-                        print(f"✓ Processed post {post['id']}: {result['sentiment']}")
-                    elif result['status'] == 'ignored':
-                        print(f"○ Ignored post {post['id']}: {result['message']}")
+            if len(posts) == PROCESS_BATCH_SIZE:
+                # Probably more waiting, so let the other workers join in
+                work_available.set()
 
-            # Wait before checking again
-            await asyncio.sleep(2)
+            results = await process_claimed_posts(posts)
+            await _notify_processed(results)
+
+            processed = sum(1 for r in results if r['status'] == 'processed')
+            ignored = sum(1 for r in results if r['status'] == 'ignored')
+            print(f"✓ Processed batch of {len(posts)} posts: {processed} processed, {ignored} ignored")
 
         except Exception as e:
             print(f"Error in background processor: {e}")
             await asyncio.sleep(5)  # Wait longer on error
 
-# Queue for storing newly processed posts (for SSE)
-processed_posts_queue = asyncio.Queue()
+async def _notify_processed(results: List[dict]):
+    """Broadcast successfully processed posts, and any spikes they reveal, to SSE clients"""
+    processed = [result for result in results if result['status'] == 'processed']
+    if processed:
+        # Stats, feed and trends have changed, so polled responses are stale
+        dashboard_cache.data_changed()
+    for result in processed:
+        broadcast(result)
+        for alert in spike_detector.observe(result['keywords'], result['sentiment']):
+            SPIKE_ALERTS.labels(type=alert['type']).inc()
+            broadcast(alert, event="alert")
 
 async def process_post_and_notify(post_id: int) -> dict:
     """
-    Process a post and add to notification queue for SSE
+    Process a post and broadcast it to SSE clients
 
     Args:
         post_id: ID of the post to process
@@ -141,9 +374,19 @@ async def process_post_and_notify(post_id: int) -> dict:
         Processing result
     """
     result = await process_single_post(post_id)
+    await _notify_processed([result])
+    return result
 
-    # If successfully processed, add to notification queue
-    if result['status'] == 'processed':
-        await processed_posts_queue.put(result)
+async def process_posts_batch_and_notify(post_ids: List[int]) -> List[dict]:
+    """
+    Process a batch of posts and broadcast the processed ones to SSE clients
 
-    return result
+    Args:
+        post_ids: IDs of the posts to process
+
+    Returns:
+        Processing results
+    """
+    results = await process_posts_batch(post_ids)
+    await _notify_processed(results)
+    return results
@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Serialized responses kept (one per path + query string)
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+
+# Max age of a cached response even without invalidation, for data that
+# changes without a processed post (time windows moving, archiving)
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "5"))
+
+# Under steady ingest, responses are invalidated by new posts at most this
+# often, so polls in between are served from the cache
+RESPONSE_CACHE_MIN_FRESH_MS = float(os.getenv("RESPONSE_CACHE_MIN_FRESH_MS", "1000"))
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches our ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+class CachedResponse:
+    """A serialized JSON body with its ETag and the data version it was built at"""
+
+    __slots__ = ("body", "etag", "version", "created")
+
+    def __init__(self, body: bytes, version: int):
+        self.body = body
+        # Content hash, so a recomputed but identical response keeps its ETag
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        self.version = version
+        self.created = time.monotonic()
+
+class ResponseCache:
+    """
+    Serialized API responses, invalidated when the underlying data changes
+
+    Every cached response records the data version it was computed at;
+    invalidate() bumps the version, so the next request for each key
+    recomputes it once. New posts go through data_changed() instead,
+    which invalidates at most once per RESPONSE_CACHE_MIN_FRESH_MS:
+    otherwise a steady stream of posts would clear the cache before any
+    poll could hit it. Concurrent requests for a key that is being
+    computed wait for that computation instead of running the same
+    query again (single-flight).
+
+    Args:
+        max_entries: Responses kept before the least recently used is dropped
+        ttl: Seconds a response may be served without being recomputed
+        min_fresh: Seconds between invalidations by data_changed()
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL_SECONDS,
+                 min_fresh: float = RESPONSE_CACHE_MIN_FRESH_MS / 1000):
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl
+        self.min_fresh = min_fresh
+        self.version = 0
+        self._invalidated_at = float("-inf")
+        # A data change not applied yet because the last invalidation was too recent
+        self._changed = False
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, int], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def invalidate(self):
+        """Mark every cached response stale now (call after keywords change)"""
+        self.version += 1
+        self._entries.clear()
+        self._invalidated_at = time.monotonic()
+        self._changed = False
+
+    def data_changed(self):
+        """
+        Note new data (processed posts), invalidating at most once per min_fresh
+
+        A change inside the window is applied by the first lookup after
+        it, so responses are never more than min_fresh behind.
+        """
+        self._changed = True
+        self._apply_changes()
+
+    def _apply_changes(self):
+        if self._changed and time.monotonic() - self._invalidated_at >= self.min_fresh:
+            self.invalidate()
+
+    def _lookup(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.version != self.version or time.monotonic() - entry.created >= self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remember(self, key: str, entry: CachedResponse):
+        # Drop results computed from data that has changed since
+        if not self.max_entries or entry.version != self.version:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> CachedResponse:
+        """
+        The cached response for `key`, computing and serializing it if needed
+
+        Exceptions from `compute` (like HTTPException for bad parameters)
+        reach every waiting caller and nothing is cached.
+        """
+        self._apply_changes()
+        entry = self._lookup(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        version = self.version
+        flight = self._inflight.get((key, version))
+        if flight is not None:
+            self.hits += 1
+            try:
+                return await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise
+                # The request doing the work went away, so do it ourselves
+                self.hits -= 1
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[(key, version)] = future
+        try:
+            data = await compute()
+            # Same output as FastAPI's JSONResponse
+            body = json.dumps(
+                data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+            ).encode("utf-8")
+            entry = CachedResponse(body, version)
+            self._remember(key, entry)
+            future.set_result(entry)
+            return entry
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark the exception as retrieved even if nobody else was waiting
+                future.exception()
+            raise
+        finally:
+            self._inflight.pop((key, version), None)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+# Shared cache for the polled dashboard endpoints
+dashboard_cache = ResponseCache()
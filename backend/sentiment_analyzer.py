@@ -1,25 +1,50 @@
-from transformers import pipeline
-from typing import Dict
+from typing import Dict, List, Optional
 import asyncio
+import os
 from functools import lru_cache
 
-# Global sentiment pipeline (initialized once)
-_sentiment_pipeline = None
-
-def get_sentiment_pipeline():
-    """Get or initialize the sentiment analysis pipeline"""
-    global _sentiment_pipeline
-    if _sentiment_pipeline is None:
-        print("Loading Hugging Face sentiment analysis model...")
-        # Using DistilBERT fine-tuned on SST-2 (sentiment analysis)
-        # This is a lightweight, fast model perfect for real-time analysis
-        _sentiment_pipeline = pipeline(
-            "sentiment-analysis",
-            model="distilbert-base-uncased-finetuned-sst-2-english",
-            device=-1  # Use CPU (-1), change to 0 for GPU
-        )
-        print("Model loaded successfully!")
-    return _sentiment_pipeline
+from inference_engines import MAX_INPUT_CHARS, SENTIMENT_ENGINE, SentimentEngine, create_engine
+from inference_pool import InferencePool
+from inference_scheduler import MicroBatchScheduler
+from metrics import INFERENCE_BATCH_SECONDS, INFERENCE_BATCH_SIZE
+from sentiment_cache import SentimentCache, make_cache_key
+
+# Hugging Face model used for classification
+MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+
+# Micro-batching limits for concurrent analyze_sentiment() calls
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "32"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+
+# Where inference runs: "thread" (in-process executor) or "process" (replica pool)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "thread")
+
+# Run a dummy batch in the background at startup so the first real post is fast
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "1") != "0"
+
+# Texts for quick checks of the model and engines
+SAMPLE_TEXTS = [
+    "I love this product! It's amazing!",
+    "This is terrible. Worst experience ever.",
+    "It's okay, nothing special.",
+    "The customer service was helpful and friendly!",
+    "My package arrived damaged and broken.",
+    "Tesla's autopilot almost crashed my car today. This is unacceptable!",
+    "Apple's new iOS update fixed all my issues. Love it!",
+    "Waited on hold for an hour, then the call dropped.",
+    "The new MacBook Pro is a game changer for developers!",
+    "Not sure how I feel about the redesign yet.",
+]
+
+# Global sentiment engine (initialized once)
+_sentiment_engine: Optional[SentimentEngine] = None
+
+def get_sentiment_engine() -> SentimentEngine:
+    """Get the configured sentiment engine (the model loads on first predict)"""
+    global _sentiment_engine
+    if _sentiment_engine is None:
+        _sentiment_engine = create_engine(SENTIMENT_ENGINE, MODEL_NAME)
+    return _sentiment_engine
 
 def map_sentiment_label(label: str) -> str:
     """
@@ -45,10 +70,103 @@ def determine_sentiment_with_neutral(label: str, score: float) -> tuple:
         return "NEUTRAL", score
     return map_sentiment_label(label), score
 
+def _format_result(result: Dict) -> Dict[str, any]:
+    """Turn a raw engine result into our sentiment dictionary"""
+    raw_label = result["label"]
+    raw_score = result["score"]
+
+    # Apply neutral threshold logic
+    final_label, final_score = determine_sentiment_with_neutral(raw_label, raw_score)
+
+    return {
+        "sentiment": final_label,
+        "confidence": round(final_score, 4),
+        "raw_label": raw_label
+    }
+
+def classify_texts(texts: List[str]) -> List[Dict]:
+    """Run one forward pass over a batch of texts (blocking)"""
+    return get_sentiment_engine().predict(texts)
+
+async def _run_inference_batch(texts: List[str]) -> List[Dict]:
+    """Classify a batch on the configured backend without blocking the event loop"""
+    INFERENCE_BATCH_SIZE.observe(len(texts))
+    with INFERENCE_BATCH_SECONDS.time():
+        if inference_pool is not None:
+            results = await inference_pool.classify(texts)
+        else:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(None, classify_texts, texts)
+
+    # Also covers MODEL_WARMUP=0, where the first real batch loads the model
+    if model_status["state"] != "ready":
+        model_status["state"] = "ready"
+        model_status["error"] = None
+
+    return results
+
+# Results for texts we've already classified
+sentiment_cache = SentimentCache()
+
+# Cache keys currently being classified, so concurrent duplicates wait instead
+_inflight: Dict[str, asyncio.Future] = {}
+
+# Model replicas in worker processes, when that backend is selected
+inference_pool = InferencePool() if INFERENCE_BACKEND == "process" else None
+
+# Shared scheduler that turns concurrent single-post calls into batches,
+# keeping one batch in flight per replica
+inference_scheduler = MicroBatchScheduler(
+    _run_inference_batch,
+    max_batch_size=INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=INFERENCE_MAX_WAIT_MS,
+    max_concurrency=inference_pool.workers if inference_pool is not None else 1
+)
+
+# Model readiness: "cold" -> "loading" -> "ready" (or "failed")
+model_status = {"state": "cold", "error": None}
+
+def is_model_ready() -> bool:
+    """True once the model has loaded and answered a warm-up batch"""
+    return model_status["state"] == "ready"
+
+async def warm_up_model():
+    """
+    Load the model and push a dummy batch through it
+
+    Meant to run as a background task at startup: the event loop stays free
+    while the heavy imports and weight loading happen in the executor (or in
+    every replica of the inference pool), and readiness flips to "ready"
+    only after a real forward pass has succeeded.
+    """
+    if model_status["state"] in ("loading", "ready"):
+        return
+
+    model_status["state"] = "loading"
+    model_status["error"] = None
+    try:
+        if inference_pool is not None:
+            # One chunk per replica, so every worker loads and runs once
+            await inference_pool.classify(SAMPLE_TEXTS[:1] * inference_pool.workers)
+        else:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, classify_texts, SAMPLE_TEXTS[:1])
+
+        model_status["state"] = "ready"
+        print("Sentiment model warmed up and ready")
+
+    except Exception as e:
+        model_status["state"] = "failed"
+        model_status["error"] = str(e)
+        print(f"Error warming up sentiment model: {e}")
+
 async def analyze_sentiment(text: str) -> Dict[str, any]:
     """
     Analyze sentiment of text using Hugging Face model
 
+    Concurrent calls are coalesced by the inference scheduler into a single
+    batched forward pass, so callers see the same API as before.
+
     Args:
         text: The text to analyze
 
@@ -60,30 +178,38 @@ async def analyze_sentiment(text: str) -> Dict[str, any]:
         }
     """
     try:
-        # Run the pipeline in a thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        pipeline_func = get_sentiment_pipeline()
+        key = make_cache_key(text, get_sentiment_engine().model_id, MAX_INPUT_CHARS)
 
-        # Truncate very long texts to avoid performance issues
-        max_length = 512
-        text_truncated = text[:max_length] if len(text) > max_length else text
+        # Identical text already being classified: share that result
+        pending = _inflight.get(key)
+        if pending is not None:
+            try:
+                return dict(await asyncio.shield(pending))
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The caller doing the work went away, so do it ourselves
 
-        result = await loop.run_in_executor(
-            None,
-            lambda: pipeline_func(text_truncated)[0]
-        )
+        future = asyncio.get_running_loop().create_future()
+        _inflight[key] = future
+        try:
+            result = await sentiment_cache.get(key)
+            if result is None:
+                result = _format_result(await inference_scheduler.submit(text))
+                await sentiment_cache.put(key, result)
+            future.set_result(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved even if nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            _inflight.pop(key, None)
 
-        raw_label = result["label"]
-        raw_score = result["score"]
-
-        # Apply neutral threshold logic
-        final_label, final_score = determine_sentiment_with_neutral(raw_label, raw_score)
-
-        return {
-            "sentiment": final_label,
-            "confidence": round(final_score, 4),
-            "raw_label": raw_label
-        }
+        return dict(result)
 
     except Exception as e:
         print(f"Error analyzing sentiment: {e}")
@@ -104,37 +230,31 @@ async def analyze_sentiment_batch(texts: list) -> list:
     Returns:
         list: List of sentiment dictionaries
     """
-    try:
-        loop = asyncio.get_event_loop()
-        pipeline_func = get_sentiment_pipeline()
-
-        # Truncate texts
-        max_length = 512
-        texts_truncated = [
-            text[:max_length] if len(text) > max_length else text
-            for text in texts
-        ]
+    if not texts:
+        return []
 
-        # Run batch prediction
-        results = await loop.run_in_executor(
-            None,
-            lambda: pipeline_func(texts_truncated)
-        )
+    try:
+        model_id = get_sentiment_engine().model_id
+        keys = [make_cache_key(text, model_id, MAX_INPUT_CHARS) for text in texts]
+        cached = await sentiment_cache.get_many(keys)
 
-        # Process results
-        analyzed = []
-        for result in results:
-            raw_label = result["label"]
-            raw_score = result["score"]
-            final_label, final_score = determine_sentiment_with_neutral(raw_label, raw_score)
+        # Classify each distinct uncached text once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
 
-            analyzed.append({
-                "sentiment": final_label,
-                "confidence": round(final_score, 4),
-                "raw_label": raw_label
-            })
+        if missing:
+            # Already a batch, so skip the scheduler and go straight to the model
+            results = await _run_inference_batch(list(missing.values()))
+            fresh = {
+                key: _format_result(result)
+                for key, result in zip(missing.keys(), results)
+            }
+            await sentiment_cache.put_many(fresh)
+            cached.update(fresh)
 
-        return analyzed
+        return [dict(cached[key]) for key in keys]
 
     except Exception as e:
         print(f"Error in batch analysis: {e}")
@@ -144,22 +264,55 @@ async def analyze_sentiment_batch(texts: list) -> list:
             for _ in texts
         ]
 
+def check_engine_parity(candidate: str, baseline: str = "pipeline", texts: Optional[List[str]] = None) -> Dict:
+    """
+    Compare a candidate engine's predictions against the baseline engine
+
+    Both engines score the same texts and go through the same
+    determine_sentiment_with_neutral post-processing, so the agreement
+    rate reflects what the dashboard would actually show.
+
+    Returns:
+        dict: Agreement rates and score differences
+    """
+    texts = texts or SAMPLE_TEXTS
+    baseline_results = create_engine(baseline, MODEL_NAME).predict(texts)
+    candidate_results = create_engine(candidate, MODEL_NAME).predict(texts)
+
+    label_matches = 0
+    sentiment_matches = 0
+    score_diffs = []
+    for base, cand in zip(baseline_results, candidate_results):
+        label_matches += base["label"] == cand["label"]
+        sentiment_matches += _format_result(base)["sentiment"] == _format_result(cand)["sentiment"]
+        # Compare probabilities of the same class, even if the argmax flipped
+        base_positive = base["score"] if base["label"] == "POSITIVE" else 1 - base["score"]
+        cand_positive = cand["score"] if cand["label"] == "POSITIVE" else 1 - cand["score"]
+        score_diffs.append(abs(base_positive - cand_positive))
+
+    return {
+        "baseline": baseline,
+        "candidate": candidate,
+        "texts": len(texts),
+        "label_agreement": label_matches / len(texts),
+        "sentiment_agreement": sentiment_matches / len(texts),
+        "max_score_diff": round(max(score_diffs), 4),
+        "mean_score_diff": round(sum(score_diffs) / len(score_diffs), 4)
+    }
+
 # Utility function for testing
 if __name__ == "__main__":
-    import asyncio
+    import sys
+
+    if len(sys.argv) == 3 and sys.argv[1] == "--parity":
+        # python sentiment_analyzer.py --parity quantized
+        print(check_engine_parity(sys.argv[2]))
+        sys.exit(0)
 
     async def test():
         print("Testing sentiment analyzer...")
 
-        test_texts = [
-            "I love this product! It's amazing!",
-            "This is terrible. Worst experience ever.",
-            "It's okay, nothing special.",
-            "The customer service was helpful and friendly!",
-            "My package arrived damaged and broken."
-        ]
-
-        for text in test_texts:
+        for text in SAMPLE_TEXTS[:5]:
             result = await analyze_sentiment(text)
             print(f"\nText: {text}")
             print(f"Sentiment: {result['sentiment']}")
@@ -0,0 +1,153 @@
+import aiosqlite
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# In-memory LRU size (entries) and optional on-disk tier ("" disables it)
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "50000"))
+SENTIMENT_CACHE_PATH = os.getenv("SENTIMENT_CACHE_PATH", "")
+
+def normalize_text(text: str, max_length: int) -> str:
+    """Truncate like the model input, then collapse whitespace"""
+    return " ".join(text[:max_length].split())
+
+def make_cache_key(text: str, model_id: str, max_length: int) -> str:
+    """Content hash of the normalized text, scoped to the model that scored it"""
+    payload = f"{model_id}\0{normalize_text(text, max_length)}".encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+class SentimentCache:
+    """
+    Sentiment results keyed by content hash
+
+    A bounded in-memory LRU sits in front of an optional SQLite file, so
+    repeated texts (reposts, retweets, simulated posts) skip the model and
+    the on-disk tier survives restarts.
+
+    Args:
+        max_entries: Maximum entries held in memory
+        path: SQLite file for the persistent tier, or "" to keep memory only
+    """
+
+    def __init__(self, max_entries: int = SENTIMENT_CACHE_SIZE, path: str = SENTIMENT_CACHE_PATH):
+        self.max_entries = max(0, max_entries)
+        self.path = path
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._db: Optional[aiosqlite.Connection] = None
+        self._db_lock = asyncio.Lock()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    async def _get_db(self) -> Optional[aiosqlite.Connection]:
+        """Open the persistent tier on first use"""
+        if not self.path:
+            return None
+        if self._db is None:
+            async with self._db_lock:
+                if self._db is None:
+                    db = await aiosqlite.connect(self.path)
+                    await db.execute("PRAGMA journal_mode = WAL")
+                    await db.execute("PRAGMA synchronous = NORMAL")
+                    await db.execute("""
+                        CREATE TABLE IF NOT EXISTS sentiment_cache (
+                            key TEXT PRIMARY KEY,
+                            sentiment VARCHAR(20) NOT NULL,
+                            confidence FLOAT NOT NULL,
+                            raw_label VARCHAR(20) NOT NULL
+                        ) WITHOUT ROWID
+                    """)
+                    await db.commit()
+                    self._db = db
+        return self._db
+
+    def _remember(self, key: str, result: Dict):
+        """Insert into the LRU, evicting the least recently used entries"""
+        if not self.max_entries:
+            return
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Dict]:
+        """Look up several keys, returning only the ones found"""
+        found = {}
+        missing = []
+        for key in keys:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                found[key] = dict(result)
+                self.hits += 1
+            else:
+                missing.append(key)
+
+        db = await self._get_db() if missing else None
+        if db is not None:
+            unique_missing = list(dict.fromkeys(missing))
+            for start in range(0, len(unique_missing), 500):
+                chunk = unique_missing[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = await db.execute(
+                    f"SELECT key, sentiment, confidence, raw_label FROM sentiment_cache WHERE key IN ({placeholders})",
+                    chunk
+                )
+                for key, sentiment, confidence, raw_label in await cursor.fetchall():
+                    result = {"sentiment": sentiment, "confidence": confidence, "raw_label": raw_label}
+                    self._remember(key, result)
+                    found[key] = dict(result)
+
+            still_missing = [key for key in missing if key not in found]
+            self.persistent_hits += len(missing) - len(still_missing)
+            missing = still_missing
+
+        self.misses += len(missing)
+        return found
+
+    async def get(self, key: str) -> Optional[Dict]:
+        """Look up a single key"""
+        return (await self.get_many([key])).get(key)
+
+    async def put_many(self, items: Dict[str, Dict]):
+        """Store results in memory and, if enabled, on disk"""
+        if not items:
+            return
+        for key, result in items.items():
+            self._remember(key, dict(result))
+
+        db = await self._get_db()
+        if db is not None:
+            await db.executemany(
+                "INSERT OR REPLACE INTO sentiment_cache (key, sentiment, confidence, raw_label) VALUES (?, ?, ?, ?)",
+                [
+                    (key, r["sentiment"], r["confidence"], r["raw_label"])
+                    for key, r in items.items()
+                ]
+            )
+            await db.commit()
+
+    async def put(self, key: str, result: Dict):
+        """Store a single result"""
+        await self.put_many({key: result})
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring"""
+        lookups = self.hits + self.persistent_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "persistent": bool(self.path),
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.persistent_hits) / lookups, 4) if lookups else 0.0
+        }
+
+    async def close(self):
+        """Close the persistent tier"""
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
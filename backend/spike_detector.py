@@ -0,0 +1,214 @@
+import math
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# Half-lives (seconds) of the "right now" and the baseline exponential averages
+SPIKE_SHORT_HALF_LIFE = float(os.getenv("SPIKE_SHORT_HALF_LIFE", "60"))
+SPIKE_BASELINE_HALF_LIFE = float(os.getenv("SPIKE_BASELINE_HALF_LIFE", "3600"))
+
+# Standard scores above which the recent negative ratio or volume is a spike
+SPIKE_Z_THRESHOLD = float(os.getenv("SPIKE_Z_THRESHOLD", "3"))
+
+# Recent posts (decayed count) needed before a keyword can alert at all
+SPIKE_MIN_POSTS = float(os.getenv("SPIKE_MIN_POSTS", "10"))
+
+# Negative ratio must also rise by at least this much over the baseline
+SPIKE_MIN_RATIO_INCREASE = float(os.getenv("SPIKE_MIN_RATIO_INCREASE", "0.15"))
+
+# Volume must also be at least this many times the baseline rate
+SPIKE_MIN_VOLUME_FACTOR = float(os.getenv("SPIKE_MIN_VOLUME_FACTOR", "3"))
+
+# Seconds before the same keyword can raise the same kind of alert again
+SPIKE_COOLDOWN_SECONDS = float(os.getenv("SPIKE_COOLDOWN_SECONDS", "300"))
+
+# Recent alerts kept for /api/alerts
+SPIKE_ALERT_HISTORY = int(os.getenv("SPIKE_ALERT_HISTORY", "200"))
+
+# Alerts for this keyword cover every tracked keyword together
+ALL_KEYWORDS = ""
+
+class KeywordState:
+    """
+    Exponentially decayed post and negative counts for one keyword
+
+    Two horizons are kept: a short one for what is happening now and a
+    long one as the baseline. Updating is O(1) per post and the state is
+    a handful of floats, whatever the traffic.
+    """
+
+    __slots__ = (
+        "started", "updated", "recent_posts", "recent_negative",
+        "baseline_posts", "baseline_negative", "last_alert"
+    )
+
+    def __init__(self, now: float):
+        self.started = now
+        self.updated = now
+        self.recent_posts = 0.0
+        self.recent_negative = 0.0
+        self.baseline_posts = 0.0
+        self.baseline_negative = 0.0
+        self.last_alert: Dict[str, float] = {}
+
+    def decay(self, now: float, short_tau: float, long_tau: float):
+        elapsed = max(0.0, now - self.updated)
+        if elapsed:
+            short = math.exp(-elapsed / short_tau)
+            long = math.exp(-elapsed / long_tau)
+            self.recent_posts *= short
+            self.recent_negative *= short
+            self.baseline_posts *= long
+            self.baseline_negative *= long
+            self.updated = now
+
+class SpikeDetector:
+    """
+    Streaming per-keyword detector for negative-sentiment and volume spikes
+
+    Every processed post updates the decayed counts of each keyword it
+    matched (and the all-keywords totals). Two checks run on each update:
+
+    - negative_spike: the recent negative ratio is a binomial z-score of
+      at least SPIKE_Z_THRESHOLD above the baseline ratio and at least
+      SPIKE_MIN_RATIO_INCREASE higher
+    - volume_spike: recent posts are a Poisson z-score of at least
+      SPIKE_Z_THRESHOLD above what the baseline rate predicts and at least
+      SPIKE_MIN_VOLUME_FACTOR times it
+
+    Each (keyword, kind) pair alerts at most once per cooldown.
+    """
+
+    def __init__(self, short_half_life: float = SPIKE_SHORT_HALF_LIFE,
+                 baseline_half_life: float = SPIKE_BASELINE_HALF_LIFE,
+                 history: int = SPIKE_ALERT_HISTORY):
+        # Half-life -> time constant of the exponential decay
+        self.short_tau = short_half_life / math.log(2)
+        self.long_tau = baseline_half_life / math.log(2)
+        self._states: Dict[str, KeywordState] = {}
+        self._alerts: "deque[Dict]" = deque(maxlen=max(1, history))
+        self._next_alert_id = 1
+
+    def _window(self, tau: float, state: KeywordState, now: float) -> float:
+        """Effective seconds covered by a decayed count (shorter while warming up)"""
+        return tau * (1 - math.exp(-max(now - state.started, 1e-9) / tau))
+
+    def observe(self, keywords: List[str], sentiment: str, now: Optional[float] = None) -> List[Dict]:
+        """
+        Count one processed post and return any alerts it triggers
+
+        Args:
+            keywords: Every keyword the post matched
+            sentiment: POSITIVE, NEUTRAL or NEGATIVE
+            now: Unix time of the observation (defaults to now)
+        """
+        now = time.time() if now is None else now
+        negative = 1.0 if sentiment == "NEGATIVE" else 0.0
+        alerts = []
+        for key in [ALL_KEYWORDS, *keywords]:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = KeywordState(now)
+            state.decay(now, self.short_tau, self.long_tau)
+            state.recent_posts += 1
+            state.recent_negative += negative
+            state.baseline_posts += 1
+            state.baseline_negative += negative
+            alerts.extend(self._check(key, state, now))
+        return alerts
+
+    def _metrics(self, state: KeywordState, now: float) -> Dict:
+        recent_window = self._window(self.short_tau, state, now)
+        baseline_window = self._window(self.long_tau, state, now)
+        return {
+            "negative_ratio": state.recent_negative / state.recent_posts if state.recent_posts else 0.0,
+            "baseline_negative_ratio": (
+                state.baseline_negative / state.baseline_posts if state.baseline_posts else 0.0
+            ),
+            "posts_per_minute": 60 * state.recent_posts / recent_window,
+            "baseline_posts_per_minute": 60 * state.baseline_posts / baseline_window,
+            "recent_posts": state.recent_posts,
+            "baseline_posts": state.baseline_posts,
+            # Posts the baseline rate predicts for the recent window
+            "expected_posts": state.baseline_posts * recent_window / baseline_window,
+        }
+
+    def _check(self, keyword: str, state: KeywordState, now: float) -> List[Dict]:
+        if state.recent_posts < SPIKE_MIN_POSTS:
+            return []
+        # Until the baseline covers more than the recent window, there's nothing to compare with
+        if now - state.started < 2 * self.short_tau:
+            return []
+
+        metrics = self._metrics(state, now)
+        alerts = []
+
+        ratio = metrics["negative_ratio"]
+        baseline_ratio = metrics["baseline_negative_ratio"]
+        # Keep the variance away from zero so an all-positive baseline can still alert
+        p = min(max(baseline_ratio, 0.02), 0.98)
+        ratio_z = (ratio - baseline_ratio) / math.sqrt(p * (1 - p) / state.recent_posts)
+        if ratio_z >= SPIKE_Z_THRESHOLD and ratio - baseline_ratio >= SPIKE_MIN_RATIO_INCREASE:
+            alerts.append(self._raise("negative_spike", keyword, state, now, ratio_z, metrics))
+
+        expected = max(metrics["expected_posts"], 1.0)
+        volume_z = (state.recent_posts - expected) / math.sqrt(expected)
+        if volume_z >= SPIKE_Z_THRESHOLD and state.recent_posts >= SPIKE_MIN_VOLUME_FACTOR * expected:
+            alerts.append(self._raise("volume_spike", keyword, state, now, volume_z, metrics))
+
+        return [alert for alert in alerts if alert is not None]
+
+    def _raise(self, kind: str, keyword: str, state: KeywordState, now: float,
+               z_score: float, metrics: Dict) -> Optional[Dict]:
+        last = state.last_alert.get(kind)
+        if last is not None and now - last < SPIKE_COOLDOWN_SECONDS:
+            return None
+        state.last_alert[kind] = now
+
+        alert = {
+            "id": self._next_alert_id,
+            "type": kind,
+            "keyword": keyword or None,
+            "detected_at": datetime.fromtimestamp(now, timezone.utc).isoformat(),
+            "z_score": round(z_score, 2),
+            "negative_ratio": round(metrics["negative_ratio"], 4),
+            "baseline_negative_ratio": round(metrics["baseline_negative_ratio"], 4),
+            "posts_per_minute": round(metrics["posts_per_minute"], 2),
+            "baseline_posts_per_minute": round(metrics["baseline_posts_per_minute"], 2),
+        }
+        self._next_alert_id += 1
+        self._alerts.append(alert)
+        return alert
+
+    def remember(self, alert: Dict):
+        """Add an alert raised by another worker's detector to the history"""
+        self._alerts.append(alert)
+
+    def recent_alerts(self, keyword: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Newest alerts first, optionally only for one keyword"""
+        alerts = [
+            alert for alert in reversed(self._alerts)
+            if keyword is None or alert["keyword"] == keyword
+        ]
+        return alerts[:limit]
+
+    def snapshot(self, now: Optional[float] = None) -> List[Dict]:
+        """Current recent vs baseline figures for every keyword seen"""
+        now = time.time() if now is None else now
+        status = []
+        for keyword, state in self._states.items():
+            state.decay(now, self.short_tau, self.long_tau)
+            metrics = self._metrics(state, now)
+            status.append({
+                "keyword": keyword or None,
+                "negative_ratio": round(metrics["negative_ratio"], 4),
+                "baseline_negative_ratio": round(metrics["baseline_negative_ratio"], 4),
+                "posts_per_minute": round(metrics["posts_per_minute"], 2),
+                "baseline_posts_per_minute": round(metrics["baseline_posts_per_minute"], 2),
+            })
+        return status
+
+# Shared detector fed by the post processor
+spike_detector = SpikeDetector()
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from database import count_pending_posts, create_posts_bulk
+from metrics import INGEST_BACKPRESSURE_SECONDS
+
+# Posts inserted per transaction (and acknowledged per line) by streaming ingest
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "500"))
+
+# Insert a partial chunk once its oldest post has waited this long
+INGEST_FLUSH_MS = float(os.getenv("INGEST_FLUSH_MS", "250"))
+
+# Stop reading the stream while this many posts are waiting to be processed
+INGEST_MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", "10000"))
+
+# How often a paused stream re-checks the backlog
+INGEST_BACKPRESSURE_POLL_SECONDS = float(os.getenv("INGEST_BACKPRESSURE_POLL_SECONDS", "0.5"))
+
+# Longest accepted NDJSON line; longer lines end the stream with an error
+INGEST_MAX_LINE_BYTES = int(os.getenv("INGEST_MAX_LINE_BYTES", str(1024 * 1024)))
+
+REQUIRED_FIELDS = ("text", "timestamp", "source")
+
+def parse_post_line(line: bytes) -> Dict:
+    """Parse and validate one NDJSON line into a post dict (ValueError if invalid)"""
+    try:
+        data = json.loads(line)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"invalid JSON: {e}")
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+
+    post = {}
+    for field in REQUIRED_FIELDS:
+        value = data.get(field)
+        if not isinstance(value, str):
+            raise ValueError(f"'{field}' must be a string")
+        post[field] = value
+    return post
+
+async def _wait_for_backlog() -> int:
+    """
+    Block until the processing backlog is below INGEST_MAX_PENDING
+
+    While we wait we don't read the request body, so the client's socket
+    buffer fills up and TCP flow control slows the sender down.
+
+    Returns:
+        int: Pending posts when we resumed
+    """
+    pending = await count_pending_posts()
+    if pending < INGEST_MAX_PENDING:
+        return pending
+
+    started = time.perf_counter()
+    while pending >= INGEST_MAX_PENDING:
+        await asyncio.sleep(INGEST_BACKPRESSURE_POLL_SECONDS)
+        pending = await count_pending_posts()
+    INGEST_BACKPRESSURE_SECONDS.inc(time.perf_counter() - started)
+    return pending
+
+async def ingest_ndjson(body: AsyncIterator[bytes], on_insert: Callable[[], None]) -> AsyncIterator[Dict]:
+    """
+    Insert posts from a newline-delimited JSON byte stream in bounded chunks
+
+    Lines are parsed as body chunks arrive; every INGEST_CHUNK_SIZE posts
+    (or whatever arrived within INGEST_FLUSH_MS, even if the stream then
+    goes quiet) are inserted in one transaction and acknowledged. Invalid
+    lines are reported in the ack of the chunk they fell into and skipped,
+    so one bad record doesn't drop the rest of the stream. Memory use is bounded by one chunk plus one
+    line, however long the stream runs.
+
+    Args:
+        body: Raw request body chunks
+        on_insert: Called after each chunk is stored (wakes the processors)
+
+    Yields:
+        dict: One acknowledgement per stored chunk, then a final summary
+    """
+    buffer = bytearray()
+    # Where the next newline search starts, so long lines aren't rescanned
+    scan_from = 0
+    line_number = 0
+    chunk_number = 0
+    posts: List[Dict] = []
+    rejected: List[Dict] = []
+    chunk_started = None
+    totals = {"accepted": 0, "rejected": 0}
+
+    async def flush() -> Dict:
+        nonlocal posts, rejected, chunk_number, chunk_started
+        pending = await _wait_for_backlog()
+        post_ids = await create_posts_bulk(posts)
+        if post_ids:
+            on_insert()
+
+        chunk_number += 1
+        totals["accepted"] += len(post_ids)
+        totals["rejected"] += len(rejected)
+        ack = {
+            "chunk": chunk_number,
+            "accepted": len(post_ids),
+            "first_id": post_ids[0] if post_ids else None,
+            "last_id": post_ids[-1] if post_ids else None,
+            "rejected": rejected,
+            "pending": pending + len(post_ids)
+        }
+        posts, rejected, chunk_started = [], [], None
+        return ack
+
+    def take_line(line: bytes):
+        nonlocal line_number, chunk_started
+        line_number += 1
+        line = line.strip()
+        if not line:
+            return
+        if chunk_started is None:
+            chunk_started = time.monotonic()
+        try:
+            posts.append(parse_post_line(line))
+        except ValueError as e:
+            rejected.append({"line": line_number, "error": str(e)})
+
+    def flush_wait() -> Optional[float]:
+        """Seconds until the partial chunk is due (None if there isn't one)"""
+        if chunk_started is None:
+            return None
+        return max(0.0, INGEST_FLUSH_MS / 1000 - (time.monotonic() - chunk_started))
+
+    body = body.__aiter__()
+    next_data = None
+    try:
+        while True:
+            # Read with a deadline so a stream that goes quiet still gets its
+            # partial chunk stored and acknowledged. The read isn't cancelled
+            # on timeout (that would close the body); it's picked up next time.
+            if next_data is None:
+                next_data = asyncio.ensure_future(body.__anext__())
+            done, _ = await asyncio.wait({next_data}, timeout=flush_wait())
+            if not done:
+                yield await flush()
+                continue
+            try:
+                data = next_data.result()
+            except StopAsyncIteration:
+                break
+            finally:
+                next_data = None
+
+            buffer += data
+            start = 0
+            while True:
+                end = buffer.find(b"\n", scan_from)
+                if end < 0:
+                    break
+                take_line(bytes(buffer[start:end]))
+                start = scan_from = end + 1
+                if len(posts) + len(rejected) >= INGEST_CHUNK_SIZE:
+                    yield await flush()
+            del buffer[:start]
+            scan_from = len(buffer)
+
+            if len(buffer) > INGEST_MAX_LINE_BYTES:
+                if posts or rejected:
+                    yield await flush()
+                yield {"status": "error", "error": f"line {line_number + 1} exceeds {INGEST_MAX_LINE_BYTES} bytes", **totals}
+                return
+            if flush_wait() == 0:
+                yield await flush()
+    finally:
+        if next_data is not None:
+            next_data.cancel()
+
+    # The last line doesn't need a trailing newline
+    take_line(bytes(buffer))
+    if posts or rejected:
+        yield await flush()
+
+    yield {"status": "done", "chunks": chunk_number, **totals}
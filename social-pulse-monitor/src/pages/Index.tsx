@@ -30,7 +30,7 @@ const Index = () => {
     confidence: backendPost.sentiment_score || 0,
     timestamp: new Date(backendPost.timestamp),
     source: backendPost.source,
-    keywords: backendPost.keyword_matched ? [backendPost.keyword_matched] : [],
+    keywords: backendPost.keywords ?? (backendPost.keyword_matched ? [backendPost.keyword_matched] : []),
   });
 
   // Fetch initial data
@@ -92,7 +92,7 @@ const Index = () => {
           confidence: data.confidence,
           timestamp: new Date(data.timestamp),
           source: data.source,
-          keywords: [data.keyword_matched],
+          keywords: data.keywords ?? [data.keyword_matched],
         };
 
         // Add to posts (keep last 50)
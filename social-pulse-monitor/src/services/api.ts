@@ -8,6 +8,7 @@ export interface Post {
   timestamp: string;
   source: string;
   keyword_matched: string | null;
+  keywords?: string[];
   sentiment_label: string | null;
   sentiment_score: number | null;
   processing_status: string;